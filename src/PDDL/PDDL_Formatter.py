@@ -1,5 +1,89 @@
 __author__ = 'Royce Mou'
 
+from StringIO import StringIO
+
+
+class _PDDL_Writer(object):
+    """
+    Streams formatted elements to a file object in a single pass.
+
+    Indentation is tracked as the concatenated indentation of the open elements
+    and applied to newlines as they are written. Whitespace after the last
+    non-whitespace character is held back, so that closing parentheses can be
+    placed before it, and opening parentheses are only written once the first
+    non-whitespace character inside them arrives.
+    """
+    def __init__(self, stream):
+        self.stream = stream
+        self.indents = []
+        self.indent = ''
+        self.pending = []
+        # Open parentheses, each with the whitespace written while it had no content.
+        # Started parentheses always precede the unstarted ones.
+        self.parentheses = []
+        self.started = 0
+        self.separator = None
+
+    def push_indent(self, indent):
+        self.indents.append(self.indent)
+        self.indent += indent
+
+    def pop_indent(self):
+        self.indent = self.indents.pop()
+
+    def write(self, string):
+        if not string:
+            return
+        if self.separator is not None:
+            self.pending.append(self.separator)
+            self.separator = None
+        if self.indent:
+            string = string.replace('\n', '\n' + self.indent)
+
+        body = string.strip()
+        if not body:
+            self.pending.append(string)
+            if len(self.parentheses) > self.started:
+                self.parentheses[-1].append(string)
+            return
+
+        lplace = len(string) - len(string.lstrip())
+        rplace = len(string.rstrip())
+        self.pending.append(string[:lplace])
+        self.stream.write(''.join(self.pending))
+        self.stream.write('(' * (len(self.parentheses) - self.started))
+        self.started = len(self.parentheses)
+        self.stream.write(body)
+        self.pending = [string[rplace:]]
+
+    def open(self):
+        self.parentheses.append([])
+
+    def close(self):
+        whitespace = self.parentheses.pop()
+        if self.started > len(self.parentheses):
+            self.started -= 1
+            self.stream.write(')')
+        else:
+            # Parentheses around nothing but whitespace repeat it on both sides
+            self.write('()')
+            self.pending.extend(whitespace)
+
+    def flush(self):
+        self.stream.write(''.join(self.pending))
+        self.pending = []
+
+
+# Element classes mapped to whether they override __str__, and so have to be
+# stringified rather than streamed
+_CUSTOM_STR = {}
+
+
+def _overrides_str(cls):
+    if cls not in _CUSTOM_STR:
+        _CUSTOM_STR[cls] = cls.__str__.__func__ is not _PDDL_FormatElement.__str__.__func__
+    return _CUSTOM_STR[cls]
+
 
 class _PDDL_FormatElement(object):
     """
@@ -46,14 +130,17 @@ class _PDDL_FormatElement(object):
         rplace = len(string.rstrip())
         return string[:lplace] + '(' + string[lplace:rplace] + ')' + string[rplace:]
 
-    def __str__(self):
+    def _format(self, arg_strings):
+        """
+        Formats the element around the already formatted strings of its arguments
+        """
         indent = self.indentation_level * '\t'
         subindent = self.subindentation_level * '\t'
         newline_indent = '\n' + indent
         newline_subindent = '\n' + subindent
 
-        sdisplay = ' '.join(map(str, self.args[:self.sticky]))
-        ndisplay = ''.join((newline_subindent + '{0}').format(str(arg)) for arg in self.args[self.sticky:])
+        sdisplay = ' '.join(arg_strings[:self.sticky])
+        ndisplay = ''.join(newline_subindent + arg for arg in arg_strings[self.sticky:])
         display = sdisplay + ndisplay
 
         if self.parenthesize == 'args':
@@ -69,6 +156,84 @@ class _PDDL_FormatElement(object):
 
         return display
 
+    @staticmethod
+    def _inline(arg):
+        """
+        Returns the formatted string of an argument which holds no nested
+        elements, or None if it has to be streamed
+        """
+        if not isinstance(arg, _PDDL_FormatElement) or _overrides_str(type(arg)):
+            return str(arg)
+        for nested in arg.args:
+            if isinstance(nested, _PDDL_FormatElement):
+                return None
+        return arg._format(map(str, arg.args))
+
+    def _write(self, writer):
+        # Elements without nested elements are small enough to format directly
+        display = self._inline(self)
+        if display is None:
+            self._write_nested(writer)
+        else:
+            writer.write(display)
+
+    def _write_nested(self, writer):
+        indent = self.indentation_level * '\t'
+        newline_subindent = '\n' + self.subindentation_level * '\t'
+
+        if self.display_identity:
+            writer.write(indent)
+        writer.push_indent(indent)
+        if self.parenthesize == 'all':
+            writer.open()
+
+        # The identity is separated from the arguments only if they display anything
+        identity = '' if not self.display_identity else self.identity if not self.has_colon else ':' + self.identity
+        if identity:
+            writer.write(identity)
+            writer.separator = ' ' if self.sticky else ''
+
+        if self.parenthesize == 'args':
+            writer.open()
+        # Consecutive arguments without nested elements are written in one go
+        chunks = []
+        sticky = len(self.args[:self.sticky])
+        for (i, arg) in enumerate(self.args):
+            if i >= sticky:
+                chunks.append(newline_subindent)
+            elif i:
+                chunks.append(' ')
+            display = self._inline(arg)
+            if display is None:
+                writer.write(''.join(chunks))
+                chunks = []
+                arg._write_nested(writer)
+            else:
+                chunks.append(display)
+        writer.write(''.join(chunks))
+        if self.parenthesize == 'args':
+            writer.close()
+
+        if identity:
+            writer.separator = None
+        if self.parenthesize == 'all':
+            writer.close()
+        writer.pop_indent()
+
+    def write(self, stream):
+        """
+        Writes the formatted element to a file object, in time linear in the
+        size of the output
+        """
+        writer = _PDDL_Writer(stream)
+        self._write(writer)
+        writer.flush()
+
+    def __str__(self):
+        display = StringIO()
+        self.write(display)
+        return display.getvalue()
+
 
 class define(_PDDL_FormatElement):
     """"""
@@ -95,16 +260,27 @@ class types(_PDDL_FormatElement):
             self.parenthesize = kwargs.get('parenthesize', None)
             self.subindentation_level = kwargs.get('subindentation_level', 1)
 
-        def __str__(self):
+        def _format(self, arg_strings):
+            if self.identity != 'type_':
+                return super(types._type, self)._format(arg_strings) + ' - ' + self.identity
+            else:
+                return self._parenthesize(super(types._type, self)._format(arg_strings))
+
+        def _write_nested(self, writer):
             if self.identity != 'type_':
-                return super(types._type, self).__str__() + ' - ' + self.identity
+                super(types._type, self)._write_nested(writer)
+                writer.write(' - ' + self.identity)
             else:
-                return self._parenthesize(super(types._type, self).__str__())
+                writer.open()
+                super(types._type, self)._write_nested(writer)
+                writer.close()
 
     def __init__(self, *args, **kwargs):
         super(types, self).__init__(*args, **kwargs)
+        # Type classes are created once and reused by later declarations
         for arg in self.args:
-            setattr(types, arg, type(arg, (types._type,), dict()))
+            if arg not in types.__dict__:
+                setattr(types, arg, type(arg, (types._type,), dict()))
 
 
 class constants(_PDDL_FormatElement):
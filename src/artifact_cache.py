@@ -0,0 +1,87 @@
+"""
+artifact_cache.py
+
+Content-addressed cache for generated planning artifacts such as the PDDL
+domain and SAS+ templates, shared by concurrent planner processes.
+"""
+
+import fcntl
+import hashlib
+import os
+import tempfile
+
+from contextlib import contextmanager
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+class ArtifactCache(object):
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        if not os.path.exists(cache_dir):
+            try:
+                os.makedirs(cache_dir)
+            except OSError:
+                if not os.path.isdir(cache_dir):
+                    raise
+        self.lock_file = os.path.join(cache_dir, '.lock')
+
+    @staticmethod
+    def key(*parts):
+        """
+        Hashes the repr of the given parts into a cache key
+        """
+        return hashlib.sha1(repr(parts)).hexdigest()
+
+    def _path(self, key, name):
+        return os.path.join(self.cache_dir, key + '.' + name)
+
+    @contextmanager
+    def _locked(self, mode):
+        with open(self.lock_file, 'a') as lock:
+            fcntl.flock(lock, mode)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def get(self, key, name):
+        """
+        Returns the contents of the artifact name stored under key, or None
+        """
+        path = self._path(key, name)
+        with self._locked(fcntl.LOCK_SH):
+            if not os.path.isfile(path):
+                return None
+            with open(path, 'rb') as f:
+                data = f.read()
+            # The modification time orders entries for eviction
+            os.utime(path, None)
+        return data
+
+    def put(self, key, name, data):
+        """
+        Stores data as the artifact name under key and evicts old entries
+        """
+        (fd, tmp_path) = tempfile.mkstemp(dir=self.cache_dir, prefix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        with self._locked(fcntl.LOCK_EX):
+            os.rename(tmp_path, self._path(key, name))
+            self._evict(self._path(key, name))
+
+    def _evict(self, keep):
+        entries = []
+        for f in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, f)
+            if f.startswith('.') or path == keep:
+                continue
+            stat = os.stat(path)
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for (_, size, _) in entries) + os.path.getsize(keep)
+        for (_, size, path) in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
@@ -6,22 +6,37 @@
 ################################################################################
 
 import os
+import inspect
+import pickle
 import random
 import sys
 import subprocess
 import time
-import copy
 
-from collections import defaultdict
-from itertools import combinations, permutations
-from StringIO import StringIO
-from multiprocessing import Pool
+from collections import deque
+from Queue import Queue
+from multiprocessing import Pool, cpu_count
 
-from PDDL.PDDL_Formatter import *
+import numpy as np
+
+from artifact_cache import ArtifactCache
+from batch_sampler import BatchSampler
+from bitset_engine import BitsetEngine
+from criticality import CriticalityRanking
+from edge_cut import cut_frequencies
 from host_generator import HostGenerator
-from nessus_parser import NessusParser
-from vuln_profile import VulnProfile
-from vuln_dict import VulnDict, VulnEntry
+from lazy_greedy import LazyGreedy
+from nessus_parser import NessusParser, report_files
+from planning_ir import Action, Domain, Problem
+from profile_bundle import load_bundle, write_bundle
+from reachability import exposure, file_witness
+from sas_task import SASTemplate
+from topology import TopologySnapshot
+from trial_race import TrialRace, paired_difference
+from trial_rng import TrialRNG
+from vuln_profile import VulnProfile, ACCESS_VECTORS, NUM_EXPLOIT_CLASSES, exploit_class_name
+from vuln_dict import VulnDict, checksum
+from witness_cache import MISSING, WitnessCache, common_base, plan_witness
 
 ################################################################################
 ## Constants
@@ -30,6 +45,13 @@ PROBLEM_NAME = 'ER-Full'
 DOMAIN_NAME = 'attack_planning'
 ACCESS_PROBS = {}
 
+def optional_arg(index, parse, default=None):
+    # Optional arguments given as none keep their default, so that later
+    # ones can still be given
+    if len(sys.argv) > index and sys.argv[index].lower() != 'none':
+        return parse(sys.argv[index])
+    return default
+
 if len(sys.argv) < 7:
     EVALUATION_TRIALS = 2
     HOST_NUM = 25
@@ -40,6 +62,12 @@ if len(sys.argv) < 7:
     TOPOLOGY = "GEN-1"
     MARKER = ""
     TYPE = 'OPT-VULN'
+    SOLVER = 'FD'
+    DOMAIN_MODE = 'FULL'
+    ERROR_RATE = None
+    RUN_SEED = None
+    FILE_MODE = 'SAMPLED'
+    ASSET_WEIGHTS = None
 else:
     EVALUATION_TRIALS = int(sys.argv[1])
     HOST_NUM = int(sys.argv[2])
@@ -50,450 +78,880 @@ else:
     TOPOLOGY = sys.argv[7]
     MARKER = sys.argv[8]
     TYPE = sys.argv[9]
+    # FD runs Fast Downward on every trial, NATIVE decides reachability in-process
+    # and BATCH evaluates all trials of a candidate together in the bitset engine.
+    # SAS writes each trial's task from a grounded template and only runs the search.
+    SOLVER = optional_arg(10, str, 'FD')
+    # FULL has one exploit action per vulnerability, CLASS one per exploit class
+    DOMAIN_MODE = optional_arg(11, str, 'FULL')
+    # With an error rate, candidates that are clearly worse than the best one
+    # of their round stop early instead of running every trial
+    ERROR_RATE = optional_arg(12, float)
+    # The seed the topology and all trials are drawn from, to replay a run
+    RUN_SEED = optional_arg(13, int)
+    # SAMPLED places the file on a random host in every trial, ALL averages
+    # over every host it may be on, weighted by the asset values read from
+    # the ASSET_WEIGHTS file if there is one (NATIVE and BATCH only)
+    FILE_MODE = optional_arg(14, str, 'SAMPLED')
+    ASSET_WEIGHTS = optional_arg(15, str)
+
+# Trials run per candidate between early stopping checks
+TRIAL_BATCH = 25
+# Tasks handed to the pool at a time, the rest wait until results come back
+TASK_WINDOW = 4 * cpu_count()
+# Trials whose witnesses are kept per point for later candidates to reuse
+WITNESS_TRIALS = 200000
 
 FILE_DIR = os.path.abspath(os.path.dirname(__file__))
 FAST_DOWNWARD = os.path.join(FILE_DIR, '..', 'fast_downward', 'fast-downward.py')
 DOMAIN_FILE = os.path.join(FILE_DIR, 'PDDL', 'data', 'domain.pddl')
 PROBLEM_PATH = os.path.join(FILE_DIR, 'PDDL', 'data')
+CLASS_FILE = os.path.join(FILE_DIR, 'PDDL', 'data', 'exploit_classes.csv')
+CACHE_DIR = os.path.join(FILE_DIR, 'PDDL', 'cache')
 OUTPUT_FILE = os.path.join(FILE_DIR, 'output' + MARKER + '.csv')
 
 WIN_DESK_PATH = os.path.join(FILE_DIR, '..', 'profiles', 'Win7_2014_min.csv')
 LIN_DESK_PATH = os.path.join(FILE_DIR, '..', 'profiles', 'Ubuntu_2014.csv')
 WIN_SERV_PATH = os.path.join(FILE_DIR, '..', 'profiles', 'WinServer2012.csv')
 LIN_SERV_PATH = os.path.join(FILE_DIR, '..', 'profiles', 'Ubuntu_Server_2014.csv')
+BUNDLE_FILE = os.path.join(FILE_DIR, 'PDDL', 'data', 'profiles.bundle')
+PROFILE_PATHS = [WIN_DESK_PATH, LIN_DESK_PATH, WIN_SERV_PATH, LIN_SERV_PATH]
+EXCLUDED_YEARS = ['2017', '2016', '2015']
+
+# Worker state, loaded once per worker by init_worker. Tasks describe their
+# candidate as a delta from the base snapshot of their point, the last one
+# applied is cached per point.
+POINTS = {}
+WORKER_SNAPSHOTS = {}
+
+# The cache of generated artifacts, opened on first use
+ARTIFACT_CACHE = None
 
 
 ###############################################################################
 ## Helper Functions
 ###############################################################################
 
-def format_pddl_type(pddl_type, objects):
+def parse_profiles(profile_paths, vd):
     """
-    Formats pddl variables where pddl_type is a string and objects is 
-    an iterable containing strings that are pddl variables of type pddl_type
+    Parses a profile from each path, a report or a directory of reports,
+    streaming the reports into the profiles
     """
-    return pddl_type + '|' + ','.join(objects)
-
-def parse_predicate(p):
-    items = p.split(';')
-    yield items[0]
-    for type_pair in items[1:]:
-        t, variable_list = type_pair.split('|')
-        yield getattr(types, t)(*variable_list.split(','))
-
-def parse_parameters(p):
-    for type_pair in p.split(';'):
-        t, variable_list = type_pair.split('|')
-        yield getattr(types, t)(*variable_list.split(','))
-
-def parse_conditions(c):
-    condition_list = [predicate(*item.split(',')) for item in c.split(';')]
-    if len(condition_list) > 1:
-        return and_(*condition_list)
-    else:
-        return condition_list[0]
-
-def parse_action(a):
-    _name, _parameters, _preconditions, _effects = a.split(':')
-    return action(_name,
-                  parameters(*parse_parameters(_parameters)),
-                  precondition(parse_conditions(_preconditions)),
-                  effect(parse_conditions(_effects)),
-                  subindentation_level=2)
-
-def parse_profiles(profile_paths):
     parser = NessusParser()
     PROFILES = []
     for path in profile_paths:
-        report = parser.parse_report(path)
-        profile = VulnProfile(report, VulnDict(), path.split(os.sep)[-1])
-        profile.exclude_year(['2017', '2016', '2015'])
+        if os.path.isdir(path):
+            report = parser.iter_directory(path)
+        else:
+            report = parser.iter_report(path)
+        profile = VulnProfile(report, vd, os.path.basename(os.path.normpath(path)))
+        profile.exclude_year(EXCLUDED_YEARS)
         profile.filter_zero_day()
         PROFILES.append(profile)
 
     return PROFILES
 
-def generate_domain():
-    domain_string = StringIO()
+def load_profiles(profile_paths):
+    """
+    Returns the filtered profiles of the reports, mapped from the compiled
+    profile bundle unless the reports, the NVD feeds or the code parsing and
+    filtering them changed since it was compiled
+    """
+    vd = VulnDict()
+    reports = [[(report, checksum(report)) for report in report_files(path)] for path in profile_paths]
+    key = ArtifactCache.key(inspect.getsource(parse_profiles),
+                            inspect.getsource(inspect.getmodule(NessusParser)),
+                            inspect.getsource(inspect.getmodule(VulnDict)),
+                            inspect.getsource(inspect.getmodule(VulnProfile)), vd.vuln_dict.get_feeds(),
+                            EXCLUDED_YEARS, reports)
+
+    PROFILES = load_bundle(BUNDLE_FILE, key)
+    if PROFILES is not None:
+        print 'Loading compiled profiles:', BUNDLE_FILE
+        return PROFILES
+
+    PROFILES = parse_profiles(profile_paths, vd)
+    print 'Compiling profiles:', BUNDLE_FILE
+    write_bundle(BUNDLE_FILE, PROFILES, key)
+    return PROFILES
+
+def get_artifact_cache():
+    global ARTIFACT_CACHE
+    if ARTIFACT_CACHE is None:
+        ARTIFACT_CACHE = ArtifactCache(CACHE_DIR)
+    return ARTIFACT_CACHE
+
+def restore_cached(key, name, path):
+    """
+    Copies the cached artifact name for key to path, returns False on a cache
+    miss
+    """
+    data = get_artifact_cache().get(key, name)
+    if data is None:
+        return False
+    with open(path, 'wb') as f:
+        f.write(data)
+    return True
+
+def store_cached(key, name, path):
+    with open(path, 'rb') as f:
+        get_artifact_cache().put(key, name, f.read())
+
+def vuln_preconditions(profiles):
+    """
+    The parts of (name, vulnerability list) profiles which generated
+    artifacts depend on
+    """
+    return [(name, [(vuln.name, vuln.min_av, vuln.req_auth) for vuln in vuln_list])
+            for (name, vuln_list) in profiles]
+
+def load_sas_template(snapshot):
+    """
+    Returns the SAS+ template for snapshot, grounding it only if no cached
+    template for the same hosts, connections and profiles exists
+    """
+    compressed = DOMAIN_MODE == 'CLASS'
+    key = ArtifactCache.key(inspect.getsource(inspect.getmodule(SASTemplate)), compressed,
+                            snapshot.names, snapshot.outgoing,
+                            vuln_preconditions(sorted((name, vulns) for (name, (vulns, _)) in snapshot.profiles.items())))
+    data = get_artifact_cache().get(key, 'sas_template.pickle')
+    if data is not None:
+        print 'Reusing cached SAS+ template'
+        return pickle.loads(data)
+
+    template = SASTemplate(snapshot, compressed)
+    get_artifact_cache().put(key, 'sas_template.pickle', pickle.dumps(template, pickle.HIGHEST_PROTOCOL))
+    return template
+
+def generate_domain(host_gen, profile_list, domain_file, class_file):
+    # The domain only depends on its generator, the host names and the
+    # preconditions of the vulnerabilities
+    key = ArtifactCache.key(inspect.getsource(generate_domain), inspect.getsource(write_class_members),
+                            inspect.getsource(inspect.getmodule(Domain)),
+                            DOMAIN_MODE, [host.name for host in host_gen.get_hosts()],
+                            vuln_preconditions((profile.name, profile.vuln_list) for profile in profile_list))
+    if (restore_cached(key, 'domain.pddl', domain_file) and
+            (DOMAIN_MODE != 'CLASS' or restore_cached(key, 'exploit_classes.csv', class_file))):
+        print 'Reusing cached domain:', domain_file
+        return
+
+    hosts = host_gen.get_hosts()
+    domain_ = Domain(DOMAIN_NAME)
 
     ###############################################################################
-    ## Domain - Types
-    ##   The types begin with the label 'types' followed by a colon. 
-    ##   A comma-separated list of types follows the label.
-    ##   E.g. types:type1,type2,type3
-    ###############################################################################
-    
-    print >> domain_string, 'types:' + ','.join(['host', 'vulnerability', 'file']) 
-    
-    ###############################################################################
-    ## Domain - Constants
-    ##   The constants begin with the label 'constants' followed by a colon. 
-    ##   The constants are specified as follows:
-    ##     For a given type of constant, the type is specified by its name, 
-    ##     followed by a vertical bar and a comma-separated list of constants of
-    ##     that type.
-    ##     Each type of constant is then joined by a colon.
-    ##     E.g. constants:type1|const1,const2:type2|const3,const4
+    ## Domain - Types and Constants
+    ##   Constants are grouped by their type, a list of names per type.
     ###############################################################################
-    
-    hosts = host_gen.get_hosts()
-    hosts_string = format_pddl_type('host', [host.name for host in hosts])
-    files = format_pddl_type('file', ['File'])
-    print >> domain_string, 'constants:' + ':'.join((hosts_string, files))
-    
+
+    domain_.add_types('host', 'vulnerability', 'file')
+    domain_.add_constants('host', [host.name for host in hosts])
+    domain_.add_constants('file', ['File'])
+    if DOMAIN_MODE == 'CLASS':
+        domain_.add_constants('vulnerability', [exploit_class_name(c) for c in range(NUM_EXPLOIT_CLASSES)])
+
     ###############################################################################
     ## Domain - Predicates
-    ##   The predicates begin with the label 'predicates' followed by a colon. 
-    ##   The predicates are specified as follows:
-    ##     Each predicate consists of a semicolon-separated list of the predicate 
-    ##     name followed by its parameters. The parameters are specified in the 
-    ##     same way as the constants, by its type, followed by a vertical bar, 
-    ##     followed by a comma-separated list of parameters of that type.
-    ##     Each predicate is then joined by a colon.
-    ##     E.g. predicates:p1;type1|param1;type2|param2:p2;type3|param3,param4
+    ##   Each predicate has a name and a list of typed parameters, given as
+    ##   (type, [parameters of that type]) pairs.
     ###############################################################################
-    
-    p_1 = ';'.join(('connected', 
-                            format_pddl_type('host', ['?lh', '?rh'])))
-    p_2 = ';'.join(('has_vulnerability', 
-                            format_pddl_type('host', ['?h']), 
-                            format_pddl_type('vulnerability', ['?v'])))
-    p_3 = ';'.join(('network_access',
-                            format_pddl_type('host', ['?h'])))
-    p_4 = ';'.join(('adjacent_access',
-                            format_pddl_type('host', ['?h'])))
-    p_5 = ';'.join(('local_access',
-                            format_pddl_type('host', ['?h'])))
-    p_6 = ';'.join(('user_access',
-                            format_pddl_type('host', ['?h'])))
-    p_7 = ';'.join(('root_access',
-                            format_pddl_type('host', ['?h'])))
-    p_8 = ';'.join(('has_file',
-                            format_pddl_type('host', ['?h']),
-                            format_pddl_type('file', ['?f'])))
-    p_9 = ';'.join(('read_access',
-                            format_pddl_type('host', ['?h'])))
-    p_10 = ';'.join(('compromised',
-                            format_pddl_type('host', ['?'])))
-    p_11 = ';'.join(('accessed',
-                            format_pddl_type('file', ['?f'])))
-    
-    print >> domain_string, 'predicates:' + ':'.join((p_1, p_2, p_3, p_4, p_5, 
-                                               p_6, p_7, p_8, p_9, p_10, p_11))
-    
+
+    domain_.add_predicate('connected', [('host', ['?lh', '?rh'])])
+    domain_.add_predicate('has_vulnerability', [('host', ['?h']), ('vulnerability', ['?v'])])
+    domain_.add_predicate('network_access', [('host', ['?h'])])
+    domain_.add_predicate('adjacent_access', [('host', ['?h'])])
+    domain_.add_predicate('local_access', [('host', ['?h'])])
+    domain_.add_predicate('user_access', [('host', ['?h'])])
+    domain_.add_predicate('root_access', [('host', ['?h'])])
+    domain_.add_predicate('has_file', [('host', ['?h']), ('file', ['?f'])])
+    domain_.add_predicate('read_access', [('host', ['?h'])])
+    domain_.add_predicate('compromised', [('host', ['?'])])
+    domain_.add_predicate('accessed', [('file', ['?f'])])
+    domain_.add_predicate('has_exploit_class', [('host', ['?h']), ('vulnerability', ['?c'])])
+
     ###############################################################################
     ## Domain - Actions
-    ##   The actions begin with the label 'action' followed by a colon. 
-    ##   The actions are specified as follows:
-    ##     The parameters for an action are specified in the same way as the
-    ##     parameters for predicates, as a semicolon-delimited list of typed 
-    ##     parameters, where the type and parameter are joined by a vertical bar
-    ##     and each parameter is joined by a comma.
-    ##     The preconditions for an action are a semicolon-delimited list of 
-    ##     predicates, where each predicate is a comma-separated list of the 
-    ##     predicate name and its parameters.
-    ##     The effects for an action are a semicolon-delimited list of 
-    ##     predicates, where each predicate is a comma-separated list of the 
-    ##     predicate name and its parameters.
-    ##     The entire action is defined as a colon-separated list of 
-    ##     action, action name, parameters, preconditions, and effects.
-    ##     E.g. action:name:type1|param1;type2|param2:pred1,param2:pred2,param1
+    ##   Each action has a name, typed parameters like the predicates, and
+    ##   preconditions and effects which are lists of facts, tuples of the
+    ##   predicate name followed by its parameters.
     ###############################################################################
-    
+
     def action_exploit(vuln):
-        parameters = format_pddl_type('host', ['?h'])
-        preconditions = []
-        preconditions.append(','.join(('has_vulnerability', '?h', vuln.name)))
+        preconditions = [('has_vulnerability', '?h', vuln.name)]
         if vuln.min_av == "LOCAL":
-            preconditions.append(','.join(('local_access', '?h')))
+            preconditions.append(('local_access', '?h'))
         elif vuln.min_av == "ADJACENT":
-            preconditions.append(','.join(('adjacent_access', '?h')))
+            preconditions.append(('adjacent_access', '?h'))
         else:
-            preconditions.append(','.join(('network_access', '?h')))
+            preconditions.append(('network_access', '?h'))
         if vuln.req_auth == 'YES':
-            preconditions.append(','.join(('user_access', '?h')))
-        precondition = ';'.join(preconditions)
-        effect = ';'.join([','.join(['read_access', '?h']), ','.join(['compromised', '?h'])])
-        return ':'.join(('action', vuln.name, parameters, precondition, effect))
-    
+            preconditions.append(('user_access', '?h'))
+        effects = [('read_access', '?h'), ('compromised', '?h')]
+        return Action(vuln.name, [('host', ['?h'])], preconditions, effects)
+
+    def action_exploit_class(c):
+        preconditions = [('has_exploit_class', '?h', exploit_class_name(c)),
+                         (ACCESS_VECTORS[c // 2].lower() + '_access', '?h')]
+        if c % 2:
+            preconditions.append(('user_access', '?h'))
+        effects = [('read_access', '?h'), ('compromised', '?h')]
+        return Action('exploit-' + exploit_class_name(c), [('host', ['?h'])], preconditions, effects)
+
     def action_access():
-        parameters = ';'.join([format_pddl_type('host', ['?h']), format_pddl_type('file', ['?f'])])
-        precondition = ';'.join([','.join(['read_access', '?h']), ','.join(['has_file', '?h', '?f']), ','.join(['network_access', '?h'])])
-        effect = ','.join(['accessed', '?f'])
-        return ':'.join(['action', 'access', parameters, precondition, effect])
-    
+        preconditions = [('read_access', '?h'), ('has_file', '?h', '?f'), ('network_access', '?h')]
+        return Action('access', [('host', ['?h']), ('file', ['?f'])], preconditions, [('accessed', '?f')])
+
     def action_update_access():
-        parameters = ';'.join([format_pddl_type('host', ['?lh']), format_pddl_type('host', ['?rh'])])
-        precondition = ';'.join([','.join(['connected', '?lh', '?rh']), ','.join(['compromised', '?lh']), ','.join(['network_access', '?lh'])])
-        effect = ';'.join([','.join(['adjacent_access', '?rh']), ','.join(['network_access', '?rh'])])
-        return ':'.join(['action', 'update_access', parameters, precondition, effect])
-    
-    for profile in profile_list:
-        print >> domain_string, '\n'.join([action_exploit(vuln) for vuln in profile.vuln_list])
-    print >> domain_string, '\n'.join([action_access(), action_update_access()])
+        preconditions = [('connected', '?lh', '?rh'), ('compromised', '?lh'), ('network_access', '?lh')]
+        effects = [('adjacent_access', '?rh'), ('network_access', '?rh')]
+        return Action('update_access', [('host', ['?lh']), ('host', ['?rh'])], preconditions, effects)
+
+    if DOMAIN_MODE == 'CLASS':
+        # Exploits sharing a precondition class collapse into a single action
+        classes = set(vuln.exploit_class for profile in profile_list for vuln in profile.vuln_list)
+        for c in sorted(classes):
+            domain_.add_action(action_exploit_class(c))
+        write_class_members(profile_list, class_file)
+    else:
+        for profile in profile_list:
+            for vuln in profile.vuln_list:
+                domain_.add_action(action_exploit(vuln))
+    domain_.add_action(action_access())
+    domain_.add_action(action_update_access())
 
-    ################################################################################
-    ## Aggregates the domain for the planner
-    ################################################################################
-    
-    _types = set()
-    _constants = defaultdict(set)
-    _predicates = set()
-    _actions = set()
-    
-    for line in domain_string.getvalue().splitlines():
-        line = str(line)
-        contents = line.split(':')
-        if contents[0] == 'types':
-            for item in contents[1].strip().split(','):
-                _types.add(item)
-        if contents[0] == 'constants':
-            for type_pair in contents[1:]:
-                t, constant_list = type_pair.strip().split('|')
-                for c in constant_list.split(','):
-                    _constants[t].add(c)
-        if contents[0] == 'predicates':
-            for p in contents[1:]:
-                _predicates.add(p.strip())
-        if contents[0] == 'action':
-            _actions.add(':'.join(contents[1:]))
-    
-    # formatting
-    types_ = types(*_types)
-    constants_ = constants(*(getattr(types, k)(*v, sticky=1, subindentation_level=2) for k,v in _constants.items()),
-                           sticky=0, subindentation_level=2)
-    predicates_ = predicates(*(predicate(*parse_predicate(p)) for p in _predicates), 
-                             sticky=1, subindentation_level=2)
-    actions_ = (parse_action(a) for a in _actions)
-
-    domain_ = domain(DOMAIN_NAME, has_colon=0)
-    requirements_ = requirements(':strips', ':typing')
-
-    define_ = define(domain_, 
-                     requirements_, 
-                     types_, 
-                     constants_, 
-                     predicates_, 
-                     *actions_)
-
-    print 'Generating aggregated domain:', DOMAIN_FILE
-    with open(DOMAIN_FILE, 'w') as f:
-        print >> f, define_
-
-def generate_problem_instance(host_gen, problem_file):
-    problem_string = StringIO()
+    print 'Generating aggregated domain:', domain_file
+    with open(domain_file, 'w') as f:
+        domain_.to_pddl().write(f)
+        print >> f
+
+    store_cached(key, 'domain.pddl', domain_file)
+    if DOMAIN_MODE == 'CLASS':
+        store_cached(key, 'exploit_classes.csv', class_file)
+
+def write_class_members(profile_list, class_file):
+    """
+    Records which vulnerabilities of each profile an exploit class stands
+    for, so plans over the compressed domain can be reported in terms of CVEs
+    """
+    print 'Writing exploit class members:', class_file
+    with open(class_file, 'w') as f:
+        for profile in profile_list:
+            for vuln in profile.vuln_list:
+                print >> f, ','.join([exploit_class_name(vuln.exploit_class), profile.name, vuln.name])
+
+def generate_problem_instance(hosts, file_host, problem_file):
+    problem_ = Problem(PROBLEM_NAME, DOMAIN_NAME)
 
     ###############################################################################
-    ## Problem - Init
-    ##   The initial state begins with the label 'init' followed by a colon. 
-    ##   The initial state is defined by a semicolon-delimited list of 
-    ##   predicates, where each predicate is a comma-separated list of the 
-    ##   predicate name and its parameters.
+    ## Problem - Init and Goal
+    ##   Facts are tuples of the predicate name followed by its parameters.
     ###############################################################################
-    p_init = []
-    
-    file_host = random.choice([host.name for host in host_gen.get_hosts()])
-    p_init.append(','.join(['has_file', file_host, 'File']))
-    
-    for host in host_gen.get_hosts():
+
+    problem_.add_init(('has_file', file_host, 'File'))
+
+    for host in hosts:
         for neighbor in host.outgoing:
-            p_init.append(','.join(['connected', host.name, neighbor]))
-        for vuln in host.vulnerabilities:
-            p_init.append(','.join(['has_vulnerability', host.name, vuln.name]))
+            problem_.add_init(('connected', host.name, neighbor))
+        if DOMAIN_MODE == 'CLASS':
+            for c in range(NUM_EXPLOIT_CLASSES):
+                if host.exploit_classes & (1 << c):
+                    problem_.add_init(('has_exploit_class', host.name, exploit_class_name(c)))
+        else:
+            for vuln in host.vulnerabilities:
+                problem_.add_init(('has_vulnerability', host.name, vuln.name))
         for access_level in host.access_levels:
             if access_level == "NETWORK":
-                p_init.append(','.join(['network_access', host.name]))
+                problem_.add_init(('network_access', host.name))
             elif access_level == "ROOT":
-                p_init.append(','.join(['read_access', host.name]))
-                p_init.append(','.join(['compromised', host.name]))
+                problem_.add_init(('read_access', host.name))
+                problem_.add_init(('compromised', host.name))
             elif access_level == "USER":
-                p_init.append(','.join(['user_access', host.name]))
-                p_init.append(','.join(['read_access', host.name]))
-                p_init.append(','.join(['compromised', host.name]))
-    
-    print >> problem_string, 'init:' + ';'.join(p_init)
-    
-    p_goal = 'goal:' + ';'.join(map(','.join,[('accessed', 'File')]))
-    
-    print >> problem_string, p_goal
-    
-    ################################################################################
-    ## Aggregates the full problem for the attack planner
-    ################################################################################
-    
-    _goal = set()
-    _init = set()
-    
-    for line in problem_string.getvalue().splitlines():
-        line = str(line)
-        contents = line.split(':')
-        if contents[0] == 'init':
-            for item in contents[1].split(';'):
-                _init.add(tuple(item.strip().split(',')))
-        if contents[0] == 'goal':
-            for item in contents[1].split(';'):
-                _goal.add(tuple(item.strip().split(',')))
-    
-    problem_ = problem(PROBLEM_NAME)
-    domain_ = domain(DOMAIN_NAME)
-    init_ = init(*(predicate(*item) for item in _init), subindentation_level=2)
-    goal_ = goal(*(predicate(*goal) for goal in _goal), subindentation_level=2)
-    define_ = define(problem_, domain_, init_, goal_)
-    
+                problem_.add_init(('user_access', host.name))
+                problem_.add_init(('read_access', host.name))
+                problem_.add_init(('compromised', host.name))
+
+    problem_.add_goal(('accessed', 'File'))
+
     print 'Generating aggregated problem:', problem_file
     with open(problem_file, 'w') as p:
-        print >> p, define_
+        problem_.to_pddl().write(p)
+        print >> p
+
+class EvaluationPoint(object):
+    """
+    A configuration evaluated by an optimizer, with its trials and planning
+    artifacts. weights are the file probabilities per host for FILE_MODE ALL.
+    """
+    def __init__(self, base_snapshot, trials, seed, domain_file=None, sas_template=None, weights=None):
+        self.base_snapshot = base_snapshot
+        self.trials = trials
+        self.seed = seed
+        self.domain_file = domain_file
+        self.sas_template = sas_template
+        self.weights = weights
+
+def load_asset_weights(weights_file):
+    """
+    Reads the asset values of hosts from lines of host name or host type
+    and value
+    """
+    values = {}
+    with open(weights_file, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                (key, value) = line.split(',')
+                values[key] = float(value)
+    return values
+
+def asset_values(snapshot):
+    """
+    Returns the asset value of each host of snapshot by name, else by type,
+    and 1 for hosts without one
+    """
+    values = load_asset_weights(ASSET_WEIGHTS) if ASSET_WEIGHTS else {}
+    return np.array([values.get(name, values.get(type, 1.0)) for (name, type) in zip(snapshot.names, snapshot.types)])
+
+def load_point(host_gen, profile_list, trials, domain_file, class_file, seed=None):
+    """
+    Prepares the evaluation point of host_gen, generating the planning
+    artifacts the solver needs. Without a seed, the point gets a new one.
+    """
+    if FILE_MODE == 'ALL' and SOLVER not in ['NATIVE', 'BATCH']:
+        # The planner would have to run once per host in every trial
+        raise ValueError(''.join(['FILE_MODE ALL needs the NATIVE or BATCH solver, not ', SOLVER, '!']))
+    if SOLVER == 'FD':
+        generate_domain(host_gen, profile_list, domain_file, class_file)
+    base_snapshot = TopologySnapshot(host_gen, profile_list)
+    sas_template = load_sas_template(base_snapshot) if SOLVER == 'SAS' else None
+    if seed is None:
+        seed = random.getrandbits(64)
+    weights = None
+    if FILE_MODE == 'ALL':
+        # The file is on each host with probability proportional to its value
+        weights = asset_values(base_snapshot)
+        if weights.sum() <= 0:
+            raise ValueError(''.join(['The asset weights in ', str(ASSET_WEIGHTS), ' leave no host for the file!']))
+        weights = weights / weights.sum()
+    return EvaluationPoint(base_snapshot, trials, seed, domain_file, sas_template, weights)
+
+def seed_run(seed=None):
+    """
+    Seeds the generation of the topology and the profile assignment with
+    seed, a new one if None, and returns it for the trials to be drawn from
+    as well, so that the whole run can be replayed from it
+    """
+    if seed is None:
+        seed = random.SystemRandom().getrandbits(64)
+    random.seed(seed)
+    return seed
+
+def init_worker(points):
+    global POINTS
+    POINTS = points
+
+def worker_snapshot(point, delta):
+    if point not in WORKER_SNAPSHOTS or delta != WORKER_SNAPSHOTS[point][0]:
+        WORKER_SNAPSHOTS[point] = (delta, POINTS[point].base_snapshot.apply(delta))
+    return WORKER_SNAPSHOTS[point][1]
+
+def collapsed_trials():
+    # Only the exploit classes of the sampled vulnerabilities matter to the
+    # reachability engines and to a CLASS domain
+    return SOLVER in ['NATIVE', 'BATCH'] or DOMAIN_MODE == 'CLASS'
 
 def run_evaluation_instance(args):
-    host_gen = args[0]
-    flag = args[1]
+    """
+    Solves one trial, returning the probability that the file can be
+    accessed, 1 or 0 if the trial draws the file host, and the witness of the
+    plans found (see witness_cache)
+    """
+    point, delta, trial = args
+    # Sample the trial from the published snapshot; with NATIVE or a CLASS
+    # domain only the exploit classes of the sampled vulnerabilities matter
+    snapshot = worker_snapshot(point, delta)
+    rng = TrialRNG(POINTS[point].seed, trial)
+    hosts = snapshot.sample_hosts(rng, collapsed=collapsed_trials())
+    weights = POINTS[point].weights
+
+    if weights is not None:
+        # Only NATIVE averages over file locations here, see load_point
+        return exposure(hosts, weights)
+    (status, witness) = solve_trial(point, hosts, rng.choice(snapshot.get_host_names()))
+    return (1 if status == 0 else 0, witness)
+
+def solve_trial(point, hosts, file_host):
+    """
+    Solves the trial with the sampled hosts and the file placed on file_host,
+    returning the planner's exit status, 0 when a plan to the file exists,
+    and the witness of the plan found
+    """
+    # A worker runs one trial at a time, so its files are named after it
+    flag = os.getpid()
     problem_file = os.path.join(PROBLEM_PATH, ''.join(['problem', str(flag), '.pddl']))
-    
-    # Generate the problem instance
-    host_gen.generate_vulnerabilities()
-    host_gen.generate_access_levels()
-    generate_problem_instance(host_gen, problem_file)
-    
+
+    if SOLVER == 'NATIVE':
+        # Mirror the planner's exit status
+        witness = file_witness(hosts, file_host)
+        return (1 if witness is None else 0, witness)
+
     instance_dir = os.path.join(FILE_DIR, str(flag))
     
     if not os.path.exists(instance_dir):
         os.makedirs(instance_dir)
+    plan_file = os.path.join(instance_dir, 'sas_plan')
+    if os.path.exists(plan_file):
+        os.remove(plan_file)
+
+    if SOLVER == 'SAS':
+        # Skip PDDL and the translator, the search reads the filled-in template
+        sas_file = os.path.join(instance_dir, 'output.sas')
+        with open(sas_file, 'w') as f:
+            POINTS[point].sas_template.write(hosts, file_host, f)
+        status = subprocess.call(['python', FAST_DOWNWARD, sas_file, '--search', 'astar(lmcut())'], cwd=instance_dir)
+    else:
+        # Generate the problem instance
+        generate_problem_instance(hosts, file_host, problem_file)
+
+        status = subprocess.call(['python', FAST_DOWNWARD, POINTS[point].domain_file, problem_file,
+                                  '--search', 'astar(lmcut())'], cwd=instance_dir)
 
-    return subprocess.call(['python', FAST_DOWNWARD, DOMAIN_FILE, problem_file, '--search', 'astar(lmcut())'], cwd=instance_dir)
+    if status == 0 and os.path.exists(plan_file):
+        return (status, plan_witness(plan_file))
+    return (status, None)
+
+def evaluate_task(task):
+    point, candidate, delta, trial = task
+    return (point, candidate, trial) + run_evaluation_instance((point, delta, trial))
+
+class PendingRound(object):
+    """
+    A round of candidates of a point being evaluated on the pool, and the
+    configuration they were derived from if that is evaluated first
+    """
+    def __init__(self, race, deltas, baseline=None):
+        self.race = race
+        self.deltas = deltas
+        self.bases = [None] * len(deltas)
+        self.baseline = baseline
+        # Outstanding tasks, in total and of the current batch of each candidate
+        self.outstanding = 0
+        self.batches = [0] * len(deltas)
+
+def batch_round(point, candidates):
+    """
+    Evaluates a round of candidates of point in this process with the bitset
+    engine, returning its RoundResults
+    """
+    # The engine and sampler capture the state they are built from
+    engines = [(BitsetEngine(host_gen), BatchSampler(host_gen, host_gen.access_probs, point.seed))
+               for host_gen in candidates]
+    race = TrialRace(len(engines), point.trials, TRIAL_BATCH, ERROR_RATE, point.weights is not None)
+    while True:
+        batches = [(c, race.next_batch(c)) for c in range(len(engines))]
+        batches = [(c, batch) for (c, batch) in batches if batch]
+        if not batches:
+            return race.results()
+        for (c, batch) in batches:
+            (engine, sampler) = engines[c]
+            race.record(c, batch[0], engine.trial_outcomes(sampler, len(batch), first=batch[0],
+                                                           weights=point.weights))
+
+class RoundScheduler(object):
+    """
+    Turns the pending rounds of optimizers into (candidate, trial) tasks for
+    the pool, at most TASK_WINDOW of them in flight at a time
+    """
+    def __init__(self, points, optimizers, finished=None):
+        self.points = points
+        self.optimizers = optimizers
+        self.finished = finished
+        self.tasks = Queue()
+        # Batches of trials not handed to the pool yet, as (point, candidate,
+        # delta, trials) with trials an iterator over the trials left to solve
+        self.waiting = deque()
+        self.in_flight = 0
+        # point -> PendingRound
+        self.pending = {}
+        self.caches = dict((point, WitnessCache(points[point].base_snapshot, WITNESS_TRIALS)) for point in optimizers)
+
+    def record(self, point, candidate, trial, value, witness):
+        round_ = self.pending[point]
+        delta = round_.baseline if candidate is None else round_.deltas[candidate]
+        if value == 0 or witness is not None:
+            self.caches[point].store(delta, trial, witness, value)
+        if candidate is not None:
+            round_.race.record(candidate, trial, [value])
+
+    def complete(self, point, candidate, trial, value, witness):
+        round_ = self.pending[point]
+        round_.outstanding -= 1
+        self.record(point, candidate, trial, value, witness)
+        if candidate is None:
+            if round_.outstanding == 0:
+                self.queue_candidates(point)
+        else:
+            round_.batches[candidate] -= 1
+            if round_.batches[candidate] == 0:
+                self.queue_batch(point, candidate)
+        if round_.outstanding == 0:
+            self.advance(point, self.pending.pop(point).race.results())
+
+    def unsolved(self, point, candidate, batch):
+        # Completes the trials of batch whose witness still holds as they
+        # come up, and yields the others
+        round_ = self.pending[point]
+        for trial in batch:
+            known = MISSING
+            if round_.bases[candidate] is not None:
+                (base, element) = round_.bases[candidate]
+                known = self.caches[point].lookup(base, element, trial)
+            if known is MISSING:
+                yield trial
+            else:
+                self.complete(point, candidate, trial, *known)
+
+    def queue_batch(self, point, candidate):
+        round_ = self.pending[point]
+        batch = round_.race.next_batch(candidate)
+        round_.batches[candidate] = len(batch)
+        round_.outstanding += len(batch)
+        if batch:
+            self.waiting.append((point, candidate, round_.deltas[candidate], self.unsolved(point, candidate, batch)))
+
+    def queue_candidates(self, point):
+        round_ = self.pending[point]
+        round_.bases = [self.caches[point].base(delta) for delta in round_.deltas]
+        for base in set(base[0] for base in round_.bases if base is not None):
+            self.caches[point].touch(base)
+        for candidate in range(len(round_.deltas)):
+            self.queue_batch(point, candidate)
+
+    def fill(self):
+        # Hands tasks to the pool until TASK_WINDOW of them are in flight
+        while self.in_flight < TASK_WINDOW and self.waiting:
+            (point, candidate, delta, trials) = self.waiting[0]
+            trial = next(trials, None)
+            if trial is None:
+                self.waiting.popleft()
+            else:
+                self.tasks.put((point, candidate, delta, trial))
+                self.in_flight += 1
+
+    def start_round(self, point, candidates):
+        """
+        Queues the trials of a round of candidates, returning its results
+        right away if none of them need solving, else None
+        """
+        deltas = [self.points[point].base_snapshot.diff(host_gen) for host_gen in candidates]
+        if not deltas:
+            return []
+
+        # Each task only carries the point, the candidate and its delta,
+        # and the number of the trial. The trials of a batch are handed
+        # out together, so workers mostly find its snapshot cached.
+        trials = self.points[point].trials
+        race = TrialRace(len(deltas), trials, TRIAL_BATCH, ERROR_RATE, self.points[point].weights is not None)
+        round_ = PendingRound(race, deltas)
+        self.pending[point] = round_
+        # If the candidates each remove one element from a configuration not
+        # evaluated yet, that configuration is evaluated first
+        baseline = common_base(deltas)
+        if baseline is not None and baseline not in self.caches[point]:
+            round_.baseline = baseline
+            self.waiting.append((point, None, baseline, iter(range(trials))))
+            round_.outstanding = trials
+        else:
+            self.queue_candidates(point)
+        if round_.outstanding:
+            return None
+        return self.pending.pop(point).race.results()
+
+    def advance(self, point, successes):
+        optimizer = self.optimizers[point]
+        while True:
+            try:
+                candidates = optimizer.next() if successes is None else optimizer.send(successes)
+            except StopIteration:
+                if self.finished is not None:
+                    self.finished(point)
+                return
+            if SOLVER == 'BATCH':
+                successes = batch_round(self.points[point], candidates)
+            else:
+                successes = self.start_round(point, candidates)
+                if successes is None:
+                    return
+
+def run_optimizers(pool, points, optimizers, finished=None):
+    """
+    Drives optimizers, a dict from points to generators which yield the
+    states to evaluate each round and are sent back their RoundResults.
+    finished is called with every point whose optimizer is done.
+    """
+    scheduler = RoundScheduler(points, optimizers, finished)
+    for point in sorted(optimizers):
+        scheduler.advance(point, None)
+    scheduler.fill()
+    if not scheduler.in_flight:
+        return
+
+    try:
+        for result in pool.imap_unordered(evaluate_task, iter(scheduler.tasks.get, None)):
+            scheduler.in_flight -= 1
+            scheduler.complete(*result)
+            scheduler.fill()
+            if not scheduler.in_flight:
+                break
+    finally:
+        # Ends the task stream the pool is reading from
+        scheduler.tasks.put(None)
+
+def evaluate_configuration(host_gen, trials, settings, out):
+    start_time = time.time()
+    [successes] = yield [host_gen]
+    total_time = time.time() - start_time
+
+    print 'Average execution time', total_time / float(trials)
+    print 'Number of vulnerable configurations: ', successes
+    print >> out, ','.join([str(trials), str(successes), str(total_time / float(trials))] + settings)
+
+def removable_edges(host_gen):
+    """
+    Returns the connections edge removal considers, those leaving hosts
+    other than servers and gateways
+    """
+    edge_list = []
+    for host in host_gen.get_hosts():
+        if host.type not in ['SERVER', 'GATEWAY']:
+            edge_list.extend(host.get_outgoing())
+    return edge_list
+
+def removable_edge(hosts, edge):
+    # Removing an edge may not leave either host without connections
+    edge_nodes = edge.split('->')
+    return not (hosts[edge_nodes[0]].get_edge_count() == 1 or hosts[edge_nodes[1]].get_edge_count() == 1)
+
+def rank_removals(host_gen, profile_list, point, vulns=True, edges=True):
+    """
+    Returns the CriticalityRanking of the vulnerabilities of the profiles
+    and the removable connections of host_gen, over the trials of point
+    """
+    candidates = []
+    if vulns:
+        candidates.extend((profile.name, vuln.name) for (profile, vuln) in vuln_removals(profile_list))
+    if edges:
+        candidates.extend(removable_edges(host_gen))
+    return CriticalityRanking(TopologySnapshot(host_gen, profile_list), point.seed, point.trials,
+                              candidates, collapsed_trials())
+
+def seed_greedy(removals, trials, ranking):
+    """
+    Returns the LazyGreedy queue over removals, the outcomes gains are
+    measured against and the evaluations of the first round, taken from the
+    ranking of the removals if there is one
+    """
+    if ranking is None:
+        # The first round evaluates all candidates together and compares
+        # them to all trials being vulnerable
+        return (LazyGreedy(removals), np.ones(trials, dtype=np.int8), {})
+    evaluated = {}
+    for (k, removal) in enumerate(removals):
+        outcomes = ranking.candidate_outcomes(k)
+        evaluated[removal] = (float(outcomes.sum()) / float(trials), outcomes)
+    return (LazyGreedy(removals, ranking.gains()), ranking.outcomes, evaluated)
+
+def greedy_removal(removals, trials, ranking, without, remove, removable=None):
+    """
+    Optimizer which removes the candidate of removals gaining the most until
+    few enough configurations are vulnerable. without(candidates) yields the
+    state of the HostGenerator without each candidate in turn, and
+    remove(candidate, proportion) removes the one selected for good.
+    """
+    # Only the candidates whose last gain tops the queue are evaluated again.
+    # Gains are paired differences to the trials of the last removal.
+    (queue, base_outcomes, evaluated) = seed_greedy(removals, trials, ranking)
+    best_prop = 1
+    while(best_prop > 0.05):
+        candidates = queue.stale(removable)
+        while candidates:
+            results = yield without(candidates)
+            gains = []
+            for (candidate, successes, outcomes) in zip(candidates, results, results.outcomes):
+                evaluated[candidate] = (float(successes) / float(trials), outcomes)
+                (gain, error, _) = paired_difference(base_outcomes, outcomes)
+                print 'Proportion of vulnerable configurations: ', evaluated[candidate][0]
+                print 'Paired difference to the last removal: ', gain, '+/-', error
+                gains.append(gain)
+            queue.update(gains)
+            candidates = queue.stale(removable)
+
+        if not queue:
+            break
+        (_, best) = queue.select()
+        (best_prop, base_outcomes) = evaluated[best]
+        evaluated = {}
+        remove(best, best_prop)
+
+def vuln_removals(profile_list):
+    """
+    Returns a (profile, vulnerability) pair for every vulnerability name of
+    the profiles; removing it takes away all rows of that name
+    """
+    removals = []
+    for profile in profile_list:
+        names = set()
+        for vuln in profile.get_vulnerabilities():
+            if vuln.name not in names:
+                names.add(vuln.name)
+                removals.append((profile, vuln))
+    return removals
+
+def optimize_vulns(host_gen, profile_list, trials, settings, out, ranking=None):
+    out.write(','.join([str(trials)] + settings + [os.linesep]))
+        
+    vuln_list = []
+    for profile in profile_list:
+        vuln_list.extend(profile.get_vulnerabilities())
+    out.write(str(len(vuln_list)) + os.linesep)
+
+    def without(candidates):
+        for (profile, vuln) in candidates:
+            removed = profile.remove_vulnerability(vuln.name)
+            yield host_gen
+            for row in removed:
+                profile.add_vulnerability(row)
+
+    def remove(removal, best_prop):
+        (profile, vuln) = removal
+        out.write(','.join([vuln.name, str(best_prop), os.linesep]))
+        # Hosts keep their profiles, so every round samples the same trials
+        # and gains stay paired with the outcomes of the last removal
+        profile.remove_vulnerability(vuln.name)
+
+    return greedy_removal(vuln_removals(profile_list), trials, ranking, without, remove)
+
+def optimize_edges(host_gen, trials, settings, out, ranking=None):
+    hosts = host_gen.get_host_dict()
+    out.write(','.join([str(trials)] + settings))
+        
+    edge_list = removable_edges(host_gen)
+    out.write(str(len(edge_list)))
+
+    def without(candidates):
+        for edge in candidates:
+            edge_nodes = edge.split('->')
+            hosts[edge_nodes[0]].remove_outgoing(edge_nodes[1])
+            yield host_gen
+            hosts[edge_nodes[0]].add_outgoing(edge_nodes[1])
+
+    def removable(edge):
+        return removable_edge(hosts, edge)
+
+    def remove(edge, best_prop):
+        edge_nodes = edge.split('->')
+        outgoing_host = hosts[edge_nodes[0]]
+        out.write(','.join([edge, str(best_prop), 
+                            str(outgoing_host.get_edge_count()), 
+                            outgoing_host.get_type()]))
+        outgoing_host.remove_outgoing(edge_nodes[1])
+
+    return greedy_removal(edge_list, trials, ranking, without, remove, removable)
+
+def optimize_cuts(host_gen, profile_list, point, trials, settings, out):
+    """
+    Removes the edge of the minimum cut over the trials of point which the
+    most trials use until few enough configurations are vulnerable,
+    recomputing the cut after every removal. Only the configuration left by
+    each removal is evaluated.
+    """
+    hosts = host_gen.get_host_dict()
+    out.write(','.join([str(trials)] + settings))
+    out.write(str(len(removable_edges(host_gen))))
+
+    def removed():
+        yield host_gen
+
+    best_prop = 1
+    while(best_prop > 0.05):
+        candidates = [edge for edge in removable_edges(host_gen) if removable_edge(hosts, edge)]
+        frequencies = cut_frequencies(TopologySnapshot(host_gen, profile_list), point.seed, trials,
+                                      candidates, collapsed_trials())
+        if not frequencies:
+            break
+        best_edge = max(candidates, key=lambda edge: frequencies.get(edge, 0))
+        print 'Trials using ' + best_edge + ': ', frequencies[best_edge]
+        edge_nodes = best_edge.split('->')
+        outgoing_host = hosts[edge_nodes[0]]
+        edge_count = outgoing_host.get_edge_count()
+        outgoing_host.remove_outgoing(edge_nodes[1])
+
+        results = yield removed()
+        best_prop = float(results[0]) / float(trials)
+        out.write(','.join([best_edge, str(best_prop), str(edge_count), outgoing_host.get_type()]))
+
+def write_ranking(host_gen, profile_list, point, trials, settings, out):
+    print >> out, ','.join([str(trials)] + settings)
+    rank_removals(host_gen, profile_list, point).write(out)
+    # Nothing is left to evaluate
+    return
+    yield
+
+def make_optimizer(type, host_gen, profile_list, trials, settings, out, point=None):
+    """
+    Returns the optimizer of type over host_gen, which writes its results and
+    settings to out. A -RANKED suffix seeds the first round from a ranking.
+    """
+    if type == 'RANK':
+        return write_ranking(host_gen, profile_list, point, trials, settings, out)
+    ranked = type.endswith('-RANKED')
+    if ranked:
+        type = type[:-len('-RANKED')]
+        # The ranking draws the file host, so it cannot seed trials which
+        # average over all of them
+        ranked = FILE_MODE != 'ALL'
+
+    if type == 'EVAL':
+        return evaluate_configuration(host_gen, trials, settings, out)
+    elif type == 'EDGE-CUT':
+        return optimize_cuts(host_gen, profile_list, point, trials, settings, out)
+    elif type == 'OPT-VULN':
+        ranking = rank_removals(host_gen, profile_list, point, edges=False) if ranked else None
+        return optimize_vulns(host_gen, profile_list, trials, settings, out, ranking)
+    else:
+        ranking = rank_removals(host_gen, profile_list, point, vulns=False) if ranked else None
+        return optimize_edges(host_gen, trials, settings, out, ranking)
+
+def profile_map(profile_list):
+    """
+    Assigns the desktop profiles to generic and singleton hosts and the
+    server profiles to servers and gateways
+    """
+    return {'GENERIC': [(0.7048, profile_list[0]), (0.2952, profile_list[1])],
+            'SINGLETON': [(0.7048, profile_list[0]), (0.2952, profile_list[1])],
+            'SERVER': [(0.336, profile_list[2]), (0.664, profile_list[3])],
+            'GATEWAY': [(0.336, profile_list[2]), (0.664, profile_list[3])]}
 
 
 # Generate vulnerability PROFILES
 
 if __name__ == '__main__':
-    profile_list = parse_profiles([WIN_DESK_PATH, LIN_DESK_PATH, WIN_SERV_PATH, LIN_SERV_PATH])
-    PROFILES = {'GENERIC': [(0.7048, profile_list[0]), (0.2952, profile_list[1])],
-                'SINGLETON': [(0.7048, profile_list[0]), (0.2952, profile_list[1])],
-                'SERVER': [(0.336, profile_list[2]), (0.664, profile_list[3])],
-                'GATEWAY': [(0.336, profile_list[2]), (0.664, profile_list[3])]}
+    profile_list = load_profiles(PROFILE_PATHS)
+    PROFILES = profile_map(profile_list)
     
     # Run the host generator to initialize the topology and initial instance
+    seed = seed_run(RUN_SEED)
+    print 'Run seed', seed
     host_gen = HostGenerator(HOST_NUM, TOPOLOGY, CONNECTEDNESS, ACCESS_PROBS, PROFILES)
     
-    # Generate the Domain
-    generate_domain()
-    total_time = 0
-    
-    if TYPE == 'EVAL':
-        for _ in range(EVALUATION_TRIALS):
-            start_time = time.time()
-    
-            # Generate the problem instance
-            host_gen = HostGenerator(HOST_NUM, TOPOLOGY, CONNECTEDNESS, ACCESS_PROBS, PROFILES)
-            generate_problem_instance()
-    
-            subprocess.call(['python', FAST_DOWNWARD, '--translate', DOMAIN_FILE, PROBLEM_FILE])
-            subprocess.call(['python', FAST_DOWNWARD, 'output.sas', '--search', 'astar(lmcut())'])
-        
-            if os.path.exists(os.path.join(FILE_DIR, 'sas_plan')):
-                successes += 1
-            
-            round_time = time.time() - start_time
-            total_time += round_time
-    
-            print 'Time taken:', round_time
-        
-        print 'Average execution time', total_time / float(EVALUATION_TRIALS)
-        print 'Number of vulnerable configurations: ', successes
-        
-        with open(OUTPUT_FILE, 'a') as w:
-            print >> w, ','.join([str(EVALUATION_TRIALS), str(successes), str(total_time / float(EVALUATION_TRIALS)), str(HOST_NUM), 
-                                str(CONNECTEDNESS), str(NETWORK_ACCESS_PROB), str(ROOT_ACCESS_PROB), 
-                                str(USER_ACCESS_PROB)])
-    
-    # Optimization approach
-    elif TYPE == 'OPT-VULN':
-        pool = Pool(processes=None)
-        hosts = host_gen.get_host_dict()
-        with open(OUTPUT_FILE, 'a') as w:
-            w.write(','.join([str(EVALUATION_TRIALS), str(HOST_NUM), 
-                              str(CONNECTEDNESS), str(ACCESS_PROBS['NETWORK']), 
-                              str(ACCESS_PROBS['ROOT']), str(ACCESS_PROBS['USER']), os.linesep]))
-            
-        vuln_list = []
-        for profile in profile_list:
-            vuln_list.extend(profile.get_vulnerabilities())
-        with open(OUTPUT_FILE, 'a') as w:
-            w.write(str(len(vuln_list)) + os.linesep)
-    
-        best_prop = 1
-        while(best_prop > 0.05):
-            for profile in profile_list:
-                for vuln in profile.get_vulnerabilities():
-                    profile.remove_vulnerability(vuln.name)
-                    successes = 0
-                    
-                    pool_args = [(copy.deepcopy(host_gen), val) for val in range(EVALUATION_TRIALS)]
-                    for val in pool.imap_unordered(run_evaluation_instance, pool_args):
-                        if val == 0:
-                            successes += 1
-    
-                    prop = float(successes) / float(EVALUATION_TRIALS)
-                    
-                    if prop < best_prop:
-                        best_profile = profile
-                        best_prop = prop
-                        best_vuln = vuln
-                        
-                    profile.add_vulnerability(vuln)
-            
-            with open(OUTPUT_FILE, 'a') as w:
-                w.write(','.join([best_vuln.name, str(best_prop), os.linesep]))
-            best_profile.remove_vulnerability(best_vuln.name)
-            host_gen.assign_profiles(PROFILES)
-    
-    
-    else:
-        pool = Pool(processes=None)
-        hosts = host_gen.get_host_dict()
-        with open(OUTPUT_FILE, 'a') as w:
-            w.write(','.join([str(EVALUATION_TRIALS), str(HOST_NUM), 
-                              str(CONNECTEDNESS), str(ACCESS_PROBS['NETWORK']), 
-                              str(ACCESS_PROBS['ROOT']), str(ACCESS_PROBS['USER'])]))
-            
-        edge_list = []
-        for host in host_gen.get_hosts():
-            if host.type not in ['SERVER', 'GATEWAY']:
-                edge_list.extend(host.get_outgoing())
-        with open(OUTPUT_FILE, 'a') as w:
-            w.write(str(len(edge_list)))
-    
-        best_prop = 1
-        while(best_prop > 0.05):
-            best_edge = edge_list[0]
-            best_prop = 1
-            for edge in edge_list:
-                edge_nodes = edge.split('->')
-                if hosts[edge_nodes[0]].get_edge_count() == 1 or hosts[edge_nodes[1]].get_edge_count() == 1:
-                    continue
-                hosts[edge_nodes[0]].remove_outgoing(edge_nodes[1])
-                successes = 0
-                
-                pool_args = [(copy.deepcopy(host_gen), val) for val in range(EVALUATION_TRIALS)]
-                for val in pool.imap_unordered(run_evaluation_instance, pool_args):
-                    if val == 0:
-                        successes += 1
-
-                prop = float(successes) / float(EVALUATION_TRIALS)
-                
-                if prop < best_prop:
-                    best_prop = prop
-                    best_edge = edge
-    
-                hosts[edge_nodes[0]].add_outgoing(edge_nodes[1])
-                print 'Proportion of vulnerable configurations: ', prop
-            
-            edge_nodes = best_edge.split('->')
-            outgoing_host = hosts[edge_nodes[0]]
-
-            with open(OUTPUT_FILE, 'a') as w:
-                w.write(','.join([best_edge, str(best_prop), 
-                                  str(outgoing_host.get_edge_count()), 
-                                  outgoing_host.get_type()]))
-            edge_list.remove(best_edge)
-            outgoing_host.remove_outgoing(edge_nodes[1])
-        
\ No newline at end of file
+    # Generate the Domain, or reuse it from an earlier run with the same configuration
+    points = {0: load_point(host_gen, profile_list, EVALUATION_TRIALS, DOMAIN_FILE, CLASS_FILE, seed)}
+
+    # Workers load the profiles and topology once and only receive deltas
+    pool = Pool(processes=None, initializer=init_worker, initargs=(points,))
+
+    settings = [str(HOST_NUM), str(CONNECTEDNESS), str(ACCESS_PROBS['NETWORK']),
+                str(ACCESS_PROBS['ROOT']), str(ACCESS_PROBS['USER'])]
+    # Unbuffered, so the results of every round are kept if the run is stopped
+    with open(OUTPUT_FILE, 'a', 0) as out:
+        optimizer = make_optimizer(TYPE, host_gen, profile_list, EVALUATION_TRIALS, settings, out, points[0])
+        run_optimizers(pool, points, {0: optimizer})
@@ -0,0 +1,94 @@
+"""
+batch_sampler.py
+
+Samples host vulnerabilities and access levels for many evaluation trials at
+once with NumPy, instead of one random draw per vulnerability per host per
+trial. The draws are those of trial_rng, so trial t of a batch samples the
+same configuration as TrialRNG for trial t.
+"""
+
+import numpy as np
+
+from host_generator import vpn_roles
+from trial_rng import ACCESS_LEVEL, EXPLOIT_CLASS, VULNERABILITY, file_host_indices, name_key, uniforms
+
+class BatchSampler(object):
+    """
+    Draws the per-trial state of the hosts of a HostGenerator. Vulnerabilities
+    are indexed by profile row, access levels by the sorted keys of access_probs.
+    """
+    def __init__(self, host_gen, access_probs, seed=0):
+        self.hosts = host_gen.get_hosts()
+        self.topology = host_gen.topology
+        self.seed = seed
+        self.host_indices = range(len(self.hosts))
+
+        rows = max([len(host.vuln_profile.names) for host in self.hosts] + [0])
+        self.vuln_probs = np.zeros((len(self.hosts), rows))
+        for (h, host) in enumerate(self.hosts):
+            for vuln in host.vuln_profile.vuln_list:
+                self.vuln_probs[h, vuln.index] = vuln.probabilty
+        self.class_probs = np.array([host.vuln_profile.get_class_probabilities() for host in self.hosts])
+
+        self.levels = sorted(access_probs)
+        self.level_probs = np.array([access_probs[level] for level in self.levels])
+        # Levels assigned when the topology was generated carry over to every trial
+        self.base_levels = np.array([[level in host.access_levels for level in self.levels]
+                                     for host in self.hosts], dtype=bool).reshape(len(self.hosts), len(self.levels))
+
+    def sample_vulnerabilities(self, trials, first=0):
+        """
+        Returns a boolean matrix of shape (trials, hosts, profile rows)
+        """
+        draws = uniforms(self.seed, first, trials, VULNERABILITY, self.host_indices, range(self.vuln_probs.shape[1]))
+        return draws <= self.vuln_probs
+
+    def sample_exploit_classes(self, trials, first=0):
+        """
+        Returns a boolean matrix of shape (trials, hosts, exploit classes),
+        drawing one value per host per class instead of one per vulnerability
+        """
+        draws = uniforms(self.seed, first, trials, EXPLOIT_CLASS, self.host_indices, range(self.class_probs.shape[1]))
+        return draws < self.class_probs
+
+    def sample_access_levels(self, trials, fix_network=True, first=0):
+        """
+        Returns a boolean matrix of shape (trials, hosts, levels), following
+        HostGenerator.generate_access_levels
+        """
+        draws = uniforms(self.seed, first, trials, ACCESS_LEVEL, self.host_indices,
+                         [name_key(level) for level in self.levels])
+        sampled = draws <= self.level_probs
+        if fix_network and 'NETWORK' in self.levels:
+            sampled[:, :, self.levels.index('NETWORK')] = False
+        access = sampled | self.base_levels
+
+        if self.topology == 'GEN-1' and 'NETWORK' in self.levels and 'USER' in self.levels:
+            # grant_vpn_access of host_generator for every trial at once
+            (phished, reached) = [np.array(roles, dtype=bool) for roles in vpn_roles(self.hosts)]
+            vpn_access = access[:, phished, self.levels.index('USER')].any(axis=1)
+            access[:, reached, self.levels.index('NETWORK')] = vpn_access[:, np.newaxis]
+
+        return access
+
+    def sample_file_hosts(self, trials, first=0):
+        """
+        Returns the index of the host holding the file in each trial
+        """
+        return file_host_indices(self.seed, first, trials, len(self.hosts))
+
+    def sample(self, trials, collapsed=False, first=0):
+        """
+        Returns the (vulnerabilities, access levels) matrices for a batch of
+        trials, or (exploit classes, access levels) if collapsed
+        """
+        if collapsed:
+            return self.sample_exploit_classes(trials, first), self.sample_access_levels(trials, first=first)
+        return self.sample_vulnerabilities(trials, first), self.sample_access_levels(trials, first=first)
+
+    def iter_chunks(self, trials, chunk_size=1024, collapsed=False, first=0):
+        """
+        Yields the sampled matrices for trials in batches of at most chunk_size
+        """
+        for start in range(0, trials, chunk_size):
+            yield self.sample(min(chunk_size, trials - start), collapsed, first + start)
@@ -3,9 +3,20 @@ Created on Mar 15, 2017
 
 @author: Michael
 '''
+import imp
 import os
-import subprocess
 import math
+import sys
+
+from multiprocessing import Pool
+from StringIO import StringIO
+from host_generator import HostGenerator
+
+FILE_DIR = os.path.abspath(os.path.dirname(__file__))
+PLANNER_FILE = os.path.join(FILE_DIR, 'attack-planner.py')
+TEST_FILE = os.path.join(FILE_DIR, 'test_cases.csv')
+# Points of the sweep which are done, removed once the whole sweep is
+PROGRESS_FILE = os.path.join(FILE_DIR, 'test_cases.progress')
 
 def parse_line(line):
     line = line.split(',')
@@ -14,12 +25,16 @@ def parse_line(line):
     else:
         return range(int(line[0]), int(line[1]), int(line[2]))
 
-if __name__ == '__main__':
-    FILE_DIR = os.path.abspath(os.path.dirname(__file__))
-    PLANNER_FILE = os.path.join(FILE_DIR, 'attack-planner.py')
-    TEST_FILE = os.path.join(FILE_DIR, 'test_cases.csv')
-    
-    with open(TEST_FILE, 'r') as f:
+def read_test_cases(test_file):
+    '''
+    Returns the grid points of every set in the test file as (trials, host
+    count, connectedness, network, root and user access probabilities,
+    topology, label, type, seed) tuples. The type line of a set may be
+    followed by the seed its points are run with, otherwise each point gets
+    a new one.
+    '''
+    points = []
+    with open(test_file, 'r') as f:
         sets = int(f.readline())
         for _ in range(sets):
             trials = int(f.readline().strip('\r\n'))
@@ -30,7 +45,9 @@ if __name__ == '__main__':
             user_access_prob = parse_line(f.readline().strip('\r\n'))
             topology = f.readline().strip('\r\n').split(',')
             label = f.readline().strip('\r\n')
-            type = f.readline().strip('\r\n')
+            type = f.readline().strip('\r\n').split(',')
+            seed = int(type[1]) if len(type) > 1 and type[1] else None
+            type = type[0]
             
             if topology[0] == "ER" and topology[1] == "NO":
                     connectedness = [int(val) for val in connectedness]
@@ -45,4 +62,80 @@ if __name__ == '__main__':
                     for nap in [0.001*float(val) for val in network_access_prob]:
                         for root in root_access_prob:
                             for user in [0.001*float(uval) for uval in user_access_prob]:
-                                subprocess.call(['python', PLANNER_FILE, str(trials), str(count), str(connect), str(nap), str(root), str(user), topology, label, type, '&'])
+                                # The values the planner parses from its command line
+                                points.append((trials, int(str(count)), float(str(connect)), float(str(nap)),
+                                               float(str(root)), float(str(user)), topology, label, type, seed))
+    return points
+
+def point_key(i, point):
+    return ','.join([str(i)] + [str(val) for val in point])
+
+def run_sweep(planner, points, progress_file):
+    '''
+    Runs the planner on every grid point in this process, scheduling the
+    trials of all points onto one worker pool. Points recorded in the
+    progress file by an interrupted sweep are skipped.
+    '''
+    done = set()
+    if os.path.isfile(progress_file):
+        with open(progress_file, 'r') as f:
+            done = set(line.strip('\r\n') for line in f)
+        print 'Resuming sweep,', len(done), 'of', len(points), 'points are done'
+
+    # The NVD and the profiles are loaded once, every point changes its own copies
+    profile_list = planner.load_profiles(planner.PROFILE_PATHS)
+
+    evaluation_points = {}
+    optimizers = {}
+    outputs = {}
+    for (i, point) in enumerate(points):
+        if point_key(i, point) in done:
+            continue
+        (trials, count, connect, nap, root, user, topology, label, type, seed) = point
+        profiles = [profile.copy() for profile in profile_list]
+        PROFILES = planner.profile_map(profiles)
+        seed = planner.seed_run(seed)
+        print 'Point', point_key(i, point), 'seed', seed
+        host_gen = HostGenerator(count, topology, connect, {'NETWORK': nap, 'ROOT': root, 'USER': user}, PROFILES)
+        evaluation_points[i] = planner.load_point(host_gen, profiles, trials,
+                                                  os.path.join(planner.PROBLEM_PATH, 'domain' + str(i) + '.pddl'),
+                                                  os.path.join(planner.PROBLEM_PATH, 'exploit_classes' + str(i) + '.csv'),
+                                                  seed)
+        outputs[i] = StringIO()
+        settings = [str(count), str(connect), str(nap), str(root), str(user)]
+        optimizers[i] = planner.make_optimizer(type, host_gen, profiles, trials, settings, outputs[i],
+                                               evaluation_points[i])
+
+    def finished(i):
+        # Results are appended once a point is done, so resuming never duplicates them
+        with open(os.path.join(planner.FILE_DIR, 'output' + points[i][7] + '.csv'), 'a') as w:
+            w.write(outputs[i].getvalue())
+        with open(progress_file, 'a') as w:
+            print >> w, point_key(i, points[i])
+
+    pool = Pool(processes=None, initializer=planner.init_worker, initargs=(evaluation_points,))
+    try:
+        planner.run_optimizers(pool, evaluation_points, optimizers, finished)
+    finally:
+        pool.terminate()
+    if os.path.isfile(progress_file):
+        os.remove(progress_file)
+
+if __name__ == '__main__':
+    # Optionally the solver, domain mode, early stopping error rate, file mode
+    # and asset weights file, as taken by the planner, any of them none to
+    # keep its default
+    args = [arg if arg.lower() != 'none' else None for arg in sys.argv[1:]]
+    sys.argv = sys.argv[:1]
+    planner = imp.load_source('attack_planner', PLANNER_FILE)
+    if len(args) > 0 and args[0]:
+        planner.SOLVER = args[0]
+    if len(args) > 1 and args[1]:
+        planner.DOMAIN_MODE = args[1]
+    if len(args) > 2 and args[2]:
+        planner.ERROR_RATE = float(args[2])
+    if len(args) > 3 and args[3]:
+        planner.FILE_MODE = args[3]
+    if len(args) > 4 and args[4]:
+        planner.ASSET_WEIGHTS = args[4]
+    run_sweep(planner, read_test_cases(TEST_FILE), PROGRESS_FILE)
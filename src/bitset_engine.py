@@ -0,0 +1,111 @@
+"""
+bitset_engine.py
+
+Evaluates many trials at once by packing the per-trial host state into
+uint64 words, one bit per trial, and propagating compromise over the fixed
+host connections for all trials in the same pass.
+"""
+
+import numpy as np
+
+from vuln_profile import ACCESS_VECTORS
+
+WORD_BITS = 64
+
+def pack_trials(matrix):
+    """
+    Packs a boolean matrix of shape (trials, ...) into a uint64 array of
+    shape (..., words), where trial t is bit t % 64 of word t // 64
+    """
+    trials = matrix.shape[0]
+    words = (trials + WORD_BITS - 1) // WORD_BITS
+    padded = np.zeros((words * WORD_BITS,) + matrix.shape[1:], dtype=np.uint64)
+    padded[:trials] = matrix
+    padded = padded.reshape((words, WORD_BITS) + matrix.shape[1:])
+    shifts = np.arange(WORD_BITS, dtype=np.uint64).reshape((1, WORD_BITS) + (1,) * (matrix.ndim - 1))
+    return np.moveaxis(np.bitwise_or.reduce(padded << shifts, axis=1), 0, -1)
+
+def unpack_trials(words, trials):
+    """
+    Inverse of pack_trials for the first trials bits
+    """
+    shifts = np.arange(WORD_BITS, dtype=np.uint64)
+    bits = (words[..., np.newaxis] >> shifts) & np.uint64(1)
+    bits = bits.reshape(words.shape[:-1] + (-1,))[..., :trials]
+    return np.moveaxis(bits.astype(bool), -1, 0)
+
+def _class_index(av, auth):
+    return 2 * ACCESS_VECTORS.index(av) + (1 if auth == 'YES' else 0)
+
+class BitsetEngine(object):
+    """
+    Reachability over the topology of a HostGenerator for batches of trials
+    sampled by a BatchSampler (with collapsed exploit classes)
+    """
+    def __init__(self, host_gen):
+        hosts = host_gen.get_hosts()
+        index = dict((host.name, i) for (i, host) in enumerate(hosts))
+        edges = [(index[host.name], index[other]) for host in hosts for other in host.outgoing]
+        self.num_hosts = len(hosts)
+        self.src = np.array([edge[0] for edge in edges], dtype=np.intp)
+        self.dst = np.array([edge[1] for edge in edges], dtype=np.intp)
+
+    def reachable(self, classes, access, levels):
+        """
+        Takes the (trials, hosts, exploit classes) and (trials, hosts, levels)
+        matrices of a batch and returns a (trials, hosts) matrix of the hosts
+        which end up compromised and network accessible in each trial
+        """
+        trials = classes.shape[0]
+        classes = pack_trials(classes)
+        access = pack_trials(access)
+
+        def level(name):
+            if name in levels:
+                return access[:, levels.index(name)].copy()
+            return np.zeros((access.shape[0], access.shape[2]), dtype=np.uint64)
+
+        network = level('NETWORK')
+        user = level('USER')
+        compromised = level('ROOT') | user
+
+        def exploits(av):
+            return classes[:, _class_index(av, 'NO')] | (classes[:, _class_index(av, 'YES')] & user)
+
+        network_exploits = exploits('NETWORK')
+        adjacent_exploits = exploits('ADJACENT')
+        compromised |= network_exploits & network
+
+        footholds = np.zeros_like(compromised)
+        while True:
+            new = compromised & network & ~footholds
+            if not new.any():
+                break
+            footholds |= new
+
+            # update_access grants adjacent and network access to every neighbour
+            granted = np.zeros_like(network)
+            np.bitwise_or.at(granted, self.dst, new[self.src])
+            network |= granted
+            compromised |= (network_exploits | adjacent_exploits) & granted
+
+        return unpack_trials(compromised & network, trials)
+
+    def trial_outcomes(self, sampler, trials, chunk_size=4096, first=0, weights=None):
+        """
+        Returns whether the file host drawn by the sampler is reachable in
+        each of the trials numbered from first, evaluating chunk_size trials
+        per pass. With weights, the probabilities of the file being on each
+        host, returns the probability that it is reachable instead.
+        """
+        outcomes = np.zeros(trials, dtype=bool if weights is None else float)
+        for start in range(0, trials, chunk_size):
+            count = min(chunk_size, trials - start)
+            (classes, access) = sampler.sample(count, collapsed=True, first=first + start)
+            reach = self.reachable(classes, access, sampler.levels)
+            if weights is None:
+                file_hosts = sampler.sample_file_hosts(count, first + start)
+                outcomes[start:start + count] = reach[np.arange(count), file_hosts]
+            else:
+                outcomes[start:start + count] = reach.dot(weights)
+        return outcomes
@@ -0,0 +1,151 @@
+"""
+criticality.py
+
+Ranks the vulnerabilities and connections of a configuration by how critical
+they are to its attacks, in one pass over the trials. A candidate is critical
+in a trial if removing it alone cuts the file host off from the attacker.
+"""
+
+from collections import defaultdict
+
+import networkx as nx
+import numpy as np
+
+from reachability import host_state, usable_classes
+from trial_rng import EXPLOIT_CLASS, TrialRNG
+from vuln_profile import NUM_EXPLOIT_CLASSES, class_probabilities
+
+SOURCE = 'source'
+
+def _classes(mask):
+    return [c for c in range(NUM_EXPLOIT_CLASSES) if mask & (1 << c)]
+
+def attack_graph(hosts):
+    """
+    Returns the attack graph of a trial over hosts with sampled exploit
+    classes and access levels. Its nodes are SOURCE, ('host', i) for host i
+    becoming a foothold, ('edge', i, j) for host i granting access to host j
+    and ('exploit', i, c) for host i being compromised through exploit class c.
+    """
+    index, (outgoing, network, compromised, user, classes) = host_state(hosts)
+    graph = nx.DiGraph()
+    graph.add_node(SOURCE)
+    for i in range(len(hosts)):
+        if compromised[i] and network[i]:
+            graph.add_edge(SOURCE, ('host', i))
+        for c in _classes(usable_classes(classes[i], False, network[i], user[i])):
+            graph.add_edge(SOURCE, ('exploit', i, c))
+        # Exploits reached through a connection also have adjacent access
+        for c in _classes(usable_classes(classes[i], True, True, user[i])):
+            graph.add_edge(('exploit', i, c), ('host', i))
+        for j in outgoing[i]:
+            graph.add_edge(('host', i), ('edge', i, j))
+            if compromised[j]:
+                graph.add_edge(('edge', i, j), ('host', j))
+            for c in _classes(usable_classes(classes[j], True, True, user[j])):
+                graph.add_edge(('edge', i, j), ('exploit', j, c))
+    return index, graph
+
+class CriticalityRanking(object):
+    """
+    The criticality of removal candidates of the configuration captured by a
+    TopologySnapshot, over the trials of a run: (profile, vulnerability)
+    name pairs and 'host->other' connections. Trials sample exploit classes
+    only if collapsed, like the evaluation trials of the solver.
+    """
+    def __init__(self, snapshot, seed, trials, candidates, collapsed):
+        self.candidates = candidates
+        self.trials = trials
+        # 1 for the trials which are vulnerable
+        self.outcomes = np.zeros(trials, dtype=np.int8)
+        # The trials in which each candidate is critical
+        self.critical = np.zeros((len(candidates), trials), dtype=bool)
+        # The number of trials in which each candidate lies on a shortest attack path
+        self.on_path = np.zeros(len(candidates), dtype=int)
+
+        index = dict((name, i) for (i, name) in enumerate(snapshot.names))
+        edge_candidates = {}
+        # (profile, exploit class) -> [(candidate, vulnerability, class probability without it)]
+        vuln_candidates = defaultdict(list)
+        for (k, candidate) in enumerate(candidates):
+            if isinstance(candidate, str):
+                (host, other) = candidate.split('->')
+                edge_candidates[(index[host], index[other])] = k
+            else:
+                (profile, name) = candidate
+                vuln_list = snapshot.profiles[profile][0]
+                c = [vuln.exploit_class for vuln in vuln_list if vuln.name == name][0]
+                without = class_probabilities([vuln for vuln in vuln_list if vuln.name != name])
+                vuln_candidates[(profile, c)].append((k, name, without[c]))
+
+        for t in range(trials):
+            rng = TrialRNG(seed, t)
+            hosts = snapshot.sample_hosts(rng, collapsed)
+            file_host = rng.choice(snapshot.get_host_names())
+            (index, graph) = attack_graph(hosts)
+            goal = ('host', index[file_host])
+            if goal not in graph or not nx.has_path(graph, SOURCE, goal):
+                continue
+            self.outcomes[t] = 1
+
+            # Only nodes leading from the source to the file host can cut it off
+            relevant = (nx.ancestors(graph, goal) & nx.descendants(graph, SOURCE)) | set([goal])
+            # Nodes on a shortest attack path, which never loops back
+            from_source = nx.single_source_shortest_path_length(graph, SOURCE)
+            to_goal = nx.single_source_shortest_path_length(graph.reverse(copy=False), goal)
+            attack = set(node for node in relevant if from_source[node] + to_goal[node] == from_source[goal])
+            dominators = set()
+            immediate = nx.immediate_dominators(graph, SOURCE)
+            node = goal
+            while node != SOURCE:
+                dominators.add(node)
+                node = immediate[node]
+
+            # The nodes of the attack each candidate takes away
+            removed = defaultdict(set)
+            for node in relevant:
+                if node[0] == 'edge' and node[1:] in edge_candidates:
+                    removed[edge_candidates[node[1:]]].add(node)
+                elif node[0] == 'exploit':
+                    (_, i, c) = node
+                    for (k, name, without) in vuln_candidates.get((snapshot.host_profiles[i], c), ()):
+                        if collapsed:
+                            lost = rng.uniform(EXPLOIT_CLASS, i, c) >= without
+                        else:
+                            names = [vuln.name for vuln in hosts[i].vulnerabilities if vuln.exploit_class == c]
+                            lost = name in names and all(other == name for other in names)
+                        if lost:
+                            removed[k].add(node)
+
+            for (k, nodes) in removed.items():
+                if nodes & attack:
+                    self.on_path[k] += 1
+                if nodes & dominators:
+                    self.critical[k, t] = True
+                elif len(nodes) > 1:
+                    remaining = graph.subgraph(set(graph) - nodes)
+                    self.critical[k, t] = not nx.has_path(remaining, SOURCE, goal)
+
+    def gains(self):
+        """
+        Returns the share of trials each candidate is critical in, the drop
+        in vulnerable configurations removing it alone causes
+        """
+        return list(self.critical.mean(axis=1))
+
+    def candidate_outcomes(self, k):
+        """
+        Returns the outcomes of the trials with candidate k removed
+        """
+        return self.outcomes * ~self.critical[k]
+
+    def write(self, out):
+        """
+        Writes a line per candidate, most critical first, with the shares of
+        trials it is critical in and lies on a shortest attack path in
+        """
+        gains = self.gains()
+        for k in sorted(range(len(self.candidates)), key=lambda k: (-gains[k], -self.on_path[k])):
+            candidate = self.candidates[k]
+            label = candidate if isinstance(candidate, str) else ':'.join(candidate)
+            print >> out, ','.join([label, str(gains[k]), str(float(self.on_path[k]) / self.trials)])
@@ -0,0 +1,83 @@
+"""
+edge_cut.py
+
+Minimum edge cuts of the compromise propagation graphs of sampled trials,
+merged into one graph so that a round takes a single max-flow computation.
+"""
+
+from collections import defaultdict
+
+import networkx as nx
+
+from reachability import host_state, usable_classes
+from trial_rng import TrialRNG
+
+SOURCE = 'source'
+SINK = 'sink'
+
+def host_graph(hosts, candidates):
+    """
+    Returns (index, graph), the compromise propagation graph of a trial over
+    hosts with sampled exploit classes and access levels. Connections named
+    in candidates have capacity 1 and all others infinite capacity, so they
+    are never cut.
+    """
+    index, (outgoing, network, compromised, user, classes) = host_state(hosts)
+    graph = nx.DiGraph()
+    graph.add_node(SOURCE)
+    for i in range(len(hosts)):
+        if network[i] and (compromised[i] or usable_classes(classes[i], False, True, user[i])):
+            graph.add_edge(SOURCE, i)
+        for j in outgoing[i]:
+            # Access granted by a connection allows all exploits of a host
+            if compromised[j] or usable_classes(classes[j], True, True, user[j]):
+                if hosts[i].name + '->' + hosts[j].name in candidates:
+                    graph.add_edge(i, j, capacity=1)
+                else:
+                    graph.add_edge(i, j)
+    return index, graph
+
+def aggregate_graph(snapshot, seed, trials, candidates, collapsed):
+    """
+    Returns the union over host names of the graphs of the vulnerable trials,
+    where a candidate's capacity is the number of trials using it. File hosts
+    lead to SINK with a capacity no cut of candidates reaches.
+    """
+    candidates = set(candidates)
+    uncut = len(candidates) * trials + 1
+    graph = nx.DiGraph()
+    capacities = defaultdict(int)
+    for t in range(trials):
+        rng = TrialRNG(seed, t)
+        hosts = snapshot.sample_hosts(rng, collapsed)
+        file_host = rng.choice(snapshot.get_host_names())
+        (index, trial_graph) = host_graph(hosts, candidates)
+        goal = index[file_host]
+        if goal not in trial_graph or not nx.has_path(trial_graph, SOURCE, goal):
+            continue
+        relevant = (nx.ancestors(trial_graph, goal) & nx.descendants(trial_graph, SOURCE)) | set([SOURCE, goal])
+        for (i, j, data) in trial_graph.subgraph(relevant).edges(data=True):
+            (i, j) = tuple(node if node == SOURCE else hosts[node].name for node in (i, j))
+            graph.add_edge(i, j)
+            if 'capacity' in data:
+                capacities[(i, j)] += 1
+        capacities[(file_host, SINK)] += uncut
+    for ((i, j), capacity) in capacities.items():
+        graph.add_edge(i, j, capacity=capacity)
+    return graph
+
+def cut_frequencies(snapshot, seed, trials, candidates, collapsed):
+    """
+    Returns the candidate 'host->other' connections in a minimum cut of the
+    aggregate_graph of a run, with the number of trials using each
+    """
+    graph = aggregate_graph(snapshot, seed, trials, candidates, collapsed)
+    if SINK not in graph:
+        return {}
+    (_, (reachable, _)) = nx.minimum_cut(graph, SOURCE, SINK)
+    frequencies = {}
+    for i in reachable:
+        for j in graph.successors(i):
+            if j not in reachable and j != SINK:
+                frequencies[i + '->' + j] = graph[i][j]['capacity']
+    return frequencies
@@ -131,6 +131,27 @@ def generate_gen_1(host_list, connectedness):
 
 TOPOLOGIES = {'ER': generate_er, 'BTER': generate_bter, 'GEN-1': generate_gen_1}
 
+def vpn_roles(hosts):
+    '''
+    Returns for every host whether phishing its user grants VPN access, and
+    whether VPN access reaches it
+    '''
+    return ([host.get_type() == 'SINGLETON' for host in hosts],
+            [host.get_type() in ['GATEWAY', 'SINGLETON'] for host in hosts])
+
+def grant_vpn_access(hosts):
+    '''
+    If the Attacker successfully executes a phishing attack, they can get
+    inside the network via VPN
+    '''
+    (phished, reached) = vpn_roles(hosts)
+    vpn_access = any(p and 'USER' in host.get_access_levels() for (p, host) in zip(phished, hosts))
+    for host in [host for (r, host) in zip(reached, hosts) if r]:
+        if vpn_access:
+            host.get_access_levels().append('NETWORK')
+        elif 'NETWORK' in host.get_access_levels():
+            host.get_access_levels().remove('NETWORK')
+
 class Host(object):
     def __init__(self, name, type="GENERIC"):
         self.name = name
@@ -139,6 +160,7 @@ class Host(object):
         self.incoming = []
         self.outgoing = []
         self.access_levels = []
+        self.exploit_classes = 0
 
     def set_type(self, type):
         self.type = type
@@ -191,6 +213,9 @@ class Host(object):
 
         self.vulnerabilities = [vuln for vuln in self.vuln_profile.vuln_list 
                                     if random.random() <= vuln.probabilty]
+        self.exploit_classes = 0
+        for vuln in self.vulnerabilities:
+            self.exploit_classes |= 1 << vuln.exploit_class
 
     def generate_access_levels(self, access_probs, fix_network=True):
         for (level, prob) in access_probs.items():
@@ -234,19 +259,7 @@ class HostGenerator(object):
             host.generate_access_levels(self.access_probs, fix_network)
         
         if self.topology == 'GEN-1' and post_init:
-            # If the Attacker successfully executes a phishing attack, they can get inside the network via VPN
-            vpn_access = False
-            for host in [host for host in self.host_list if host.get_type() == 'SINGLETON']:
-                if 'USER' in host.get_access_levels():
-                    vpn_access = True
-                    break
-
-            if vpn_access:
-                for host in [host for host in self.host_list if host.get_type() in ['GATEWAY', 'SINGLETON']]:
-                    host.add_access_level('NETWORK')
-            else:
-                for host in [host for host in self.host_list if host.get_type() in ['GATEWAY', 'SINGLETON']]:
-                    host.remove_access_level('NETWORK')
+            grant_vpn_access(self.host_list)
 
     def generate_vulnerabilities(self):
         for host in self.host_list:
@@ -0,0 +1,70 @@
+"""
+lazy_greedy.py
+
+Lazy greedy selection. Candidates are queued by their last measured gain,
+which bounds the current one, so a round only evaluates the top of the queue
+again, one candidate at a time.
+"""
+
+import heapq
+
+UNMEASURED = float('inf')
+
+class LazyGreedy(object):
+    """
+    Selects among candidates, optionally starting from the gains measured
+    for them in the first round
+    """
+    def __init__(self, candidates, gains=None):
+        # Entries are (-gain bound, position, candidate, round the gain was measured in)
+        if gains is None:
+            self.heap = [(-UNMEASURED, i, candidate, -1) for (i, candidate) in enumerate(candidates)]
+        else:
+            self.heap = [(-gain, i, candidate, 0) for (i, (candidate, gain)) in enumerate(zip(candidates, gains))]
+            heapq.heapify(self.heap)
+        self.round = 0
+        self.evaluating = []
+
+    def __len__(self):
+        return len(self.heap)
+
+    def stale(self, valid=None):
+        """
+        Returns the candidates to evaluate next in this round: all which were
+        never measured if the top one was not, otherwise the top one if its
+        gain is from an earlier round. Returns nothing once the top gain is
+        current. Candidates for which valid returns False are dropped.
+        """
+        while self.heap and valid is not None and not valid(self.heap[0][2]):
+            heapq.heappop(self.heap)
+        if not self.heap or self.heap[0][3] == self.round:
+            return []
+
+        if self.heap[0][0] == -UNMEASURED:
+            self.evaluating = [entry for entry in self.heap if entry[0] == -UNMEASURED]
+            self.heap = [entry for entry in self.heap if entry[0] != -UNMEASURED]
+            heapq.heapify(self.heap)
+            if valid is not None:
+                self.evaluating = [entry for entry in self.evaluating if valid(entry[2])]
+                if not self.evaluating:
+                    return self.stale(valid)
+        else:
+            self.evaluating = [heapq.heappop(self.heap)]
+        return [entry[2] for entry in self.evaluating]
+
+    def update(self, gains):
+        """
+        Records the gains measured for the candidates last returned by stale
+        """
+        for (entry, gain) in zip(self.evaluating, gains):
+            heapq.heappush(self.heap, (-gain, entry[1], entry[2], self.round))
+        self.evaluating = []
+
+    def select(self):
+        """
+        Removes the candidate with the largest gain, which stale has to have
+        run out on, and starts the next round. Returns (gain, candidate).
+        """
+        (gain, _, candidate, _) = heapq.heappop(self.heap)
+        self.round += 1
+        return (-gain, candidate)
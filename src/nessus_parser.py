@@ -1,20 +1,25 @@
 """
 nessus_parser.py
 
-Parses Nessus vulnerability reports (CSV).
+Parses Nessus vulnerability reports, either CSV exports or native .nessus
+XML exports, into (CVE, plugin name) pairs. Reports are read as streams, and
+a directory of reports can be parsed in parallel.
 
 @author: Michael Pritchard
 """
 
+import csv
 import os
+import xml.etree.cElementTree as ElementTree
+
+from multiprocessing import Pool, cpu_count
 from vuln_profile import VulnProfile
 from vuln_dict import VulnDict, VulnEntry
 
 def main():
     report_path = os.path.join('.', 'Win7_2014_min.csv')
     parser = NessusParser()
-    report = parser.parse_report(report_path)
-    vp = VulnProfile(report)
+    vp = VulnProfile(parser.iter_report(report_path), VulnDict(), report_path)
     print(len(vp.vuln_list))
     
 class NessusEntry():
@@ -22,20 +27,81 @@ class NessusEntry():
         self.cve = cve
         self.name = name
 
+def report_files(path):
+    """
+    Returns the report files of a profile, which is a single report or a
+    directory of them
+    """
+    if not os.path.isdir(path):
+        return [path]
+    return [os.path.join(path, f) for f in sorted(os.listdir(path))
+            if f.endswith('.csv') or f.endswith('.nessus')]
+
+def report_pairs(report):
+    """
+    Returns the distinct (CVE, plugin name) pairs of a report in the order
+    they first occur. Scans of many hosts repeat the same pairs for every
+    host, so workers only send back the distinct ones.
+    """
+    seen = set()
+    pairs = []
+    for pair in NessusParser().iter_report(report):
+        if pair not in seen:
+            seen.add(pair)
+            pairs.append(pair)
+    return pairs
+
 class NessusParser(object):
     def __init__(self):
             pass
 
-    def parse_report(self, report):
-        entries = []
-        
-        with open(report, 'r') as rep:
-            for line in rep:
-                contents = line.split(',')
-                if contents[0] != '':
-                    entries.append(contents)
+    def iter_report(self, report):
+        """
+        Yields the (CVE, plugin name) pairs of a report
+        """
+        if report.endswith('.nessus'):
+            return self.iter_nessus(report)
+        else:
+            return self.iter_csv(report)
+
+    def iter_csv(self, report):
+        with open(report, 'rb') as rep:
+            rows = csv.reader(rep)
+            header = next(rows, [])
+            # Exports of Nessus carry many more columns than the trimmed profiles
+            cve = header.index('CVE') if 'CVE' in header else 0
+            name = header.index('Name') if 'Name' in header else 1
+            for row in rows:
+                if len(row) > max(cve, name) and row[cve] != '':
+                    yield (row[cve], row[name])
+
+    def iter_nessus(self, report):
+        context = ElementTree.iterparse(report, events=('end',))
+        for (_, elem) in context:
+            if elem.tag == 'ReportItem':
+                for cve in elem.findall('cve'):
+                    yield (cve.text, elem.get('pluginName'))
+                elem.clear()
+            elif elem.tag == 'ReportHost':
+                elem.clear()
 
-        return entries
+    def iter_directory(self, directory, processes=None):
+        """
+        Yields the distinct (CVE, plugin name) pairs of every report in a
+        directory, parsing the reports in parallel. Pairs are yielded in the
+        order of the sorted report names.
+        """
+        reports = report_files(directory)
+        pool = Pool(processes or cpu_count())
+        try:
+            seen = set()
+            for pairs in pool.imap(report_pairs, reports):
+                for pair in pairs:
+                    if pair not in seen:
+                        seen.add(pair)
+                        yield pair
+        finally:
+            pool.terminate()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,91 @@
+"""
+planning_ir.py
+
+In-memory representation of attack planning domains and problems, which
+to_pddl turns into PDDL formatter elements for writing.
+"""
+
+from collections import OrderedDict
+
+from PDDL import PDDL_Formatter as pddl
+
+def _typed(parameters):
+    return [getattr(pddl.types, t)(*variables) for (t, variables) in parameters]
+
+def _conjunction(facts):
+    conditions = [pddl.predicate(*fact) for fact in facts]
+    if len(conditions) > 1:
+        return pddl.and_(*conditions)
+    else:
+        return conditions[0]
+
+class Action(object):
+    def __init__(self, name, parameters, precondition, effect):
+        self.name = name
+        self.parameters = parameters
+        self.precondition = precondition
+        self.effect = effect
+
+class Domain(object):
+    def __init__(self, name, requirements=(':strips', ':typing')):
+        self.name = name
+        self.requirements = list(requirements)
+        self.types = []
+        self.constants = OrderedDict()
+        self.predicates = OrderedDict()
+        self.actions = OrderedDict()
+
+    def add_types(self, *types):
+        self.types.extend(t for t in types if t not in self.types)
+
+    def add_constants(self, type, constants):
+        self.constants.setdefault(type, []).extend(constants)
+
+    def add_predicate(self, name, parameters):
+        self.predicates[name] = parameters
+
+    def add_action(self, action):
+        # Actions are identified by name, e.g. the same CVE in several profiles
+        if action.name not in self.actions:
+            self.actions[action.name] = action
+
+    def to_pddl(self):
+        # The types have to be declared before typed parameters can be formatted
+        types_ = pddl.types(*self.types)
+        constants_ = pddl.constants(*(getattr(pddl.types, t)(*c, sticky=1, subindentation_level=2)
+                                      for (t, c) in self.constants.items()),
+                                    sticky=0, subindentation_level=2)
+        predicates_ = pddl.predicates(*(pddl.predicate(name, *_typed(parameters))
+                                        for (name, parameters) in self.predicates.items()),
+                                      sticky=1, subindentation_level=2)
+        actions_ = (pddl.action(a.name,
+                                pddl.parameters(*_typed(a.parameters)),
+                                pddl.precondition(_conjunction(a.precondition)),
+                                pddl.effect(_conjunction(a.effect)),
+                                subindentation_level=2)
+                    for a in self.actions.values())
+
+        return pddl.define(pddl.domain(self.name, has_colon=0),
+                           pddl.requirements(*self.requirements),
+                           types_,
+                           constants_,
+                           predicates_,
+                           *actions_)
+
+class Problem(object):
+    def __init__(self, name, domain_name):
+        self.name = name
+        self.domain_name = domain_name
+        self.init = OrderedDict()
+        self.goal = []
+
+    def add_init(self, fact):
+        self.init[fact] = None
+
+    def add_goal(self, fact):
+        self.goal.append(fact)
+
+    def to_pddl(self):
+        init_ = pddl.init(*(pddl.predicate(*fact) for fact in self.init), subindentation_level=2)
+        goal_ = pddl.goal(*(pddl.predicate(*fact) for fact in self.goal), subindentation_level=2)
+        return pddl.define(pddl.problem(self.name), pddl.domain(self.domain_name), init_, goal_)
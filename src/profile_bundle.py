@@ -0,0 +1,85 @@
+"""
+profile_bundle.py
+
+Compiles filtered vulnerability profiles into a binary bundle which later
+runs memory-map instead of parsing the reports again: a magic line, a pickled
+header and the raw arrays of every profile.
+"""
+
+import os
+import pickle
+import struct
+import tempfile
+
+import numpy as np
+
+from vuln_profile import VulnProfile
+
+MAGIC = 'PROFILE-BUNDLE 1\n'
+ALIGNMENT = 8
+
+# Columns of a VulnProfile stored as arrays and in the header
+ARRAY_COLUMNS = ['probabilities', 'auth', 'av_codes', 'exploit_classes', 'years', 'published_years']
+LIST_COLUMNS = ['names', 'cwes', 'published_dates', 'min_avs', 'confidentiality']
+
+def _aligned(n):
+    return -(-n // ALIGNMENT) * ALIGNMENT
+
+def write_bundle(path, profiles, key):
+    """
+    Writes the active vulnerabilities of the profiles to a bundle at path,
+    compiled for key
+    """
+    header = {'key': key, 'profiles': []}
+    arrays = []
+    size = 0
+    for profile in profiles:
+        rows = np.flatnonzero(profile.active)
+        entry = {'name': profile.name, 'class_probs': profile.get_class_probabilities(), 'arrays': {}}
+        for column in LIST_COLUMNS:
+            entry[column] = [getattr(profile, column)[i] for i in rows]
+        for column in ARRAY_COLUMNS:
+            array = np.ascontiguousarray(getattr(profile, column)[rows])
+            entry['arrays'][column] = (size, array.dtype.str, len(array))
+            arrays.append((size, array))
+            size += _aligned(array.nbytes)
+        header['profiles'].append(entry)
+
+    header = pickle.dumps(header, pickle.HIGHEST_PROTOCOL)
+    start = _aligned(len(MAGIC) + 8 + len(header))
+    (fd, tmp_path) = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<Q', len(header)))
+        f.write(header)
+        for (offset, array) in arrays:
+            f.seek(start + offset)
+            f.write(array.tostring())
+        f.truncate(start + size)
+    # Processes loading the bundle meanwhile keep their mapping of the old file
+    os.rename(tmp_path, path)
+
+def load_bundle(path, key):
+    """
+    Returns the profiles of the bundle at path, with their arrays mapped
+    read-only, or None if there is no bundle compiled for key
+    """
+    if not os.path.isfile(path):
+        return None
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            return None
+        (length,) = struct.unpack('<Q', f.read(8))
+        header = pickle.loads(f.read(length))
+    if header['key'] != key:
+        return None
+
+    start = _aligned(len(MAGIC) + 8 + length)
+    data = np.memmap(path, dtype=np.uint8, mode='r')
+    profiles = []
+    for entry in header['profiles']:
+        columns = dict((column, entry[column]) for column in LIST_COLUMNS)
+        for (column, (offset, dtype, count)) in entry['arrays'].items():
+            columns[column] = np.frombuffer(data, dtype, count, start + offset)
+        profiles.append(VulnProfile.from_columns(entry['name'], columns, entry['class_probs']))
+    return profiles
@@ -0,0 +1,143 @@
+"""
+reachability.py
+
+Decides whether the attack planning goal is reachable without an external
+planner. The domain is delete-free, so propagating compromise to a fixpoint
+decides it, and the path back from the file host is a witness of the plan.
+"""
+
+from vuln_profile import ACCESS_VECTORS, NUM_EXPLOIT_CLASSES
+
+def _class_mask(av=None, auth=None):
+    mask = 0
+    for c in range(NUM_EXPLOIT_CLASSES):
+        if av is not None and ACCESS_VECTORS[c // 2] != av:
+            continue
+        if auth is not None and ('YES' if c % 2 else 'NO') != auth:
+            continue
+        mask |= 1 << c
+    return mask
+
+# Bit masks over exploit classes. LOCAL exploits never fire since no action
+# grants local_access.
+ADJACENT_CLASSES = _class_mask(av='ADJACENT')
+NETWORK_CLASSES = _class_mask(av='NETWORK')
+NO_AUTH_CLASSES = _class_mask(auth='NO')
+
+def usable_classes(classes, adjacent, network, user):
+    """
+    Returns the bit mask of the exploit classes in classes which can be used
+    given the current access facts of a host
+    """
+    usable = 0
+    if adjacent:
+        usable |= ADJACENT_CLASSES
+    if network:
+        usable |= NETWORK_CLASSES
+    if not user:
+        usable &= NO_AUTH_CLASSES
+    return classes & usable
+
+def exploitable(classes, adjacent, network, user):
+    """
+    Whether a host holding vulnerabilities of the exploit classes in the
+    bit mask classes can be compromised given its current access facts
+    """
+    return bool(usable_classes(classes, adjacent, network, user))
+
+def _lowest_class(mask):
+    return (mask & -mask).bit_length() - 1
+
+def propagate(outgoing, network, compromised, user, classes, reasons=None):
+    """
+    Propagates compromise to a fixpoint and returns the final (compromised,
+    network) lists. If given, reasons records the (granting host, exploit
+    class) through which each host was reached, None for initial access.
+    """
+    network = list(network)
+    compromised = list(compromised)
+
+    for i in range(len(outgoing)):
+        if not compromised[i] and exploitable(classes[i], False, network[i], user[i]):
+            compromised[i] = True
+            if reasons is not None:
+                reasons[i] = (None, _lowest_class(usable_classes(classes[i], False, network[i], user[i])))
+
+    # Compromised hosts with network access can grant access to their neighbours
+    frontier = [i for i in range(len(outgoing)) if compromised[i] and network[i]]
+    footholds = set(frontier)
+    while frontier:
+        i = frontier.pop()
+        for j in outgoing[i]:
+            if reasons is not None and not network[j]:
+                reasons[j] = (i, reasons[j][1])
+            network[j] = True
+            if not compromised[j] and exploitable(classes[j], True, True, user[j]):
+                compromised[j] = True
+                if reasons is not None:
+                    reasons[j] = (i, _lowest_class(usable_classes(classes[j], True, True, user[j])))
+            if compromised[j] and j not in footholds:
+                footholds.add(j)
+                frontier.append(j)
+
+    return compromised, network
+
+def host_state(hosts):
+    """
+    Extracts the propagation inputs from a list of hosts with sampled
+    vulnerabilities (or exploit classes) and access levels
+    """
+    index = dict((host.name, i) for (i, host) in enumerate(hosts))
+    outgoing = [[index[other] for other in host.outgoing] for host in hosts]
+    network = ['NETWORK' in host.access_levels for host in hosts]
+    compromised = ['ROOT' in host.access_levels or 'USER' in host.access_levels for host in hosts]
+    user = ['USER' in host.access_levels for host in hosts]
+    classes = [host.exploit_classes for host in hosts]
+    return index, (outgoing, network, compromised, user, classes)
+
+def file_witness(hosts, file_host):
+    """
+    Returns the witness of a plan to access a file placed on the host named
+    file_host, a frozenset of the 'host->other' connections and the (host,
+    exploit class) exploits it uses, or None if there is no plan
+    """
+    index, state = host_state(hosts)
+    reasons = [(None, None)] * len(hosts)
+    compromised, network = propagate(*state, reasons=reasons)
+    i = index[file_host]
+    if not (compromised[i] and network[i]):
+        return None
+
+    witness = set()
+    _trace(hosts, reasons, i, witness)
+    return frozenset(witness)
+
+def exposure(hosts, weights):
+    """
+    Returns the probability that the planner can access a file placed on one
+    of hosts with the probabilities weights, and the witness of the plans
+    to all hosts of positive weight it can access, or None if there are none
+    """
+    index, state = host_state(hosts)
+    reasons = [(None, None)] * len(hosts)
+    compromised, network = propagate(*state, reasons=reasons)
+
+    value = 0.0
+    witness = set()
+    for i in range(len(hosts)):
+        if compromised[i] and network[i] and weights[i] > 0:
+            value += weights[i]
+            _trace(hosts, reasons, i, witness)
+    if value == 0:
+        return (0.0, None)
+    return (value, frozenset(witness))
+
+def _trace(hosts, reasons, i, witness):
+    # Adds the connections and exploits which led to host i to witness
+    while i is not None:
+        (granter, c) = reasons[i]
+        if c is not None:
+            witness.add((hosts[i].name, c))
+        if granter is not None:
+            witness.add(hosts[granter].name + '->' + hosts[i].name)
+        i = granter
@@ -0,0 +1,121 @@
+"""
+sas_task.py
+
+Grounds the attack planning domain once into a SAS+ template and writes the
+output.sas task of each trial from it, so only the Fast Downward search runs
+per trial.
+"""
+
+from vuln_profile import ACCESS_VECTORS, NUM_EXPLOIT_CLASSES, exploit_class_name
+
+# Fluents of each host, in the order of their variables
+HOST_FLUENTS = ['network_access', 'adjacent_access', 'read_access', 'compromised']
+
+class SASTemplate(object):
+    """
+    Grounded operators over every host and every vulnerability of any profile
+    in a TopologySnapshot, or every exploit class if compressed. Snapshots
+    derived from it by removing vulnerabilities, edges or reassigning
+    profiles can use the same template.
+    """
+    def __init__(self, snapshot, compressed=False):
+        self.compressed = compressed
+        self.names = snapshot.get_host_names()
+        self.index = dict((name, i) for (i, name) in enumerate(self.names))
+        self.goal_var = len(HOST_FLUENTS) * len(self.names)
+
+        variables = []
+        for name in self.names:
+            for fluent in HOST_FLUENTS:
+                variables.append('%s(%s)' % (fluent, name))
+        variables.append('accessed(File)')
+
+        header = ['begin_version', '3', 'end_version', 'begin_metric', '0', 'end_metric', str(len(variables))]
+        for (i, atom) in enumerate(variables):
+            header.extend(['begin_variable', 'var' + str(i), '-1', '2',
+                           'Atom ' + atom, 'NegatedAtom ' + atom, 'end_variable'])
+        header.append('0')
+        self.header = '\n'.join(header) + '\n'
+
+        # (host, vulnerability or exploit class) -> (requires user_access, operator)
+        self.exploits = {}
+        for c in range(NUM_EXPLOIT_CLASSES if compressed else 0):
+            if ACCESS_VECTORS[c // 2] == 'LOCAL':
+                continue
+            for name in self.names:
+                operator = self._operator('exploit-%s %s' % (exploit_class_name(c), name),
+                                          [self.var(name, ACCESS_VECTORS[c // 2].lower() + '_access')],
+                                          [self.var(name, 'read_access'), self.var(name, 'compromised')])
+                self.exploits[(name, c)] = (c % 2 == 1, operator)
+        for (vuln_list, _) in ([] if compressed else snapshot.profiles.values()):
+            for vuln in vuln_list:
+                if vuln.min_av == 'LOCAL':
+                    continue
+                precondition = 'adjacent_access' if vuln.min_av == 'ADJACENT' else 'network_access'
+                for name in self.names:
+                    if (name, vuln.name) in self.exploits:
+                        continue
+                    operator = self._operator(vuln.name + ' ' + name,
+                                              [self.var(name, precondition)],
+                                              [self.var(name, 'read_access'), self.var(name, 'compromised')])
+                    self.exploits[(name, vuln.name)] = (vuln.req_auth == 'YES', operator)
+
+        # (host, other) -> operator
+        self.updates = {}
+        for (name, outgoing) in zip(self.names, snapshot.outgoing):
+            for other in outgoing:
+                prevail = [self.var(name, 'compromised'), self.var(name, 'network_access')]
+                effects = [self.var(other, 'adjacent_access'), self.var(other, 'network_access')]
+                self.updates[(name, other)] = self._operator('update_access %s %s' % (name, other),
+                                                             prevail, [var for var in effects if var not in prevail])
+
+        # host -> operator
+        self.accesses = dict((name, self._operator('access %s File' % name,
+                                                   [self.var(name, 'read_access'), self.var(name, 'network_access')],
+                                                   [self.goal_var]))
+                             for name in self.names)
+
+    def var(self, name, fluent):
+        return len(HOST_FLUENTS) * self.index[name] + HOST_FLUENTS.index(fluent)
+
+    @staticmethod
+    def _operator(name, prevail, effects):
+        lines = ['begin_operator', name, str(len(prevail))]
+        lines.extend('%d 0' % var for var in prevail)
+        lines.append(str(len(effects)))
+        lines.extend('0 %d -1 0' % var for var in effects)
+        lines.extend(['1', 'end_operator'])
+        return '\n'.join(lines)
+
+    def write(self, hosts, file_host, stream):
+        """
+        Writes the SAS+ task of one trial, given its sampled hosts and the
+        name of the host holding the file, to a file object
+        """
+        state = [1] * (self.goal_var + 1)
+        operators = [self.accesses[file_host]]
+        for host in hosts:
+            user = 'USER' in host.access_levels
+            if 'NETWORK' in host.access_levels:
+                state[self.var(host.name, 'network_access')] = 0
+            if user or 'ROOT' in host.access_levels:
+                state[self.var(host.name, 'read_access')] = 0
+                state[self.var(host.name, 'compromised')] = 0
+            if self.compressed:
+                keys = [c for c in range(NUM_EXPLOIT_CLASSES) if host.exploit_classes & (1 << c)]
+            else:
+                keys = [vuln.name for vuln in host.vulnerabilities]
+            for key in keys:
+                (req_auth, operator) = self.exploits.get((host.name, key), (False, None))
+                if operator is not None and (user or not req_auth):
+                    operators.append(operator)
+            for other in host.outgoing:
+                operators.append(self.updates[(host.name, other)])
+
+        stream.write(self.header)
+        stream.write('begin_state\n' + '\n'.join(map(str, state)) + '\nend_state\n')
+        stream.write('begin_goal\n1\n%d 0\nend_goal\n' % self.goal_var)
+        stream.write(str(len(operators)) + '\n')
+        for operator in operators:
+            stream.write(operator + '\n')
+        stream.write('0\n')
@@ -0,0 +1,144 @@
+"""
+topology.py
+
+Read-only snapshot of a generated network which evaluation trials sample
+from, so that trials no longer need their own copy of the HostGenerator.
+"""
+
+import copy
+
+from collections import defaultdict
+from host_generator import grant_vpn_access
+from trial_rng import ACCESS_LEVEL, EXPLOIT_CLASS, VULNERABILITY, name_key
+from vuln_profile import class_probabilities
+
+class TrialHost(object):
+    """
+    The sampled state of one host in a single trial
+    """
+    def __init__(self, name, type, outgoing, access_levels):
+        self.name = name
+        self.type = type
+        self.outgoing = outgoing
+        self.access_levels = access_levels
+        self.vulnerabilities = []
+        self.exploit_classes = 0
+
+    def get_type(self):
+        return self.type
+
+    def get_access_levels(self):
+        return self.access_levels
+
+class TopologySnapshot(object):
+    """
+    Captures the hosts, connections, profiles and fixed access levels of a
+    HostGenerator. Later changes are sent to workers as small deltas (see diff).
+    """
+    def __init__(self, host_gen, profiles=()):
+        hosts = host_gen.get_hosts()
+        self.topology = host_gen.topology
+        self.access_probs = tuple(sorted(host_gen.access_probs.items()))
+        self.names = tuple(host.name for host in hosts)
+        self.types = tuple(host.get_type() for host in hosts)
+        self.outgoing = tuple(tuple(host.outgoing) for host in hosts)
+        self.access_levels = tuple(tuple(host.access_levels) for host in hosts)
+
+        self.profiles = {}
+        for profile in [host.vuln_profile for host in hosts] + list(profiles):
+            if profile.name not in self.profiles:
+                self.profiles[profile.name] = (tuple(profile.get_vulnerabilities()),
+                                               tuple(profile.get_class_probabilities()))
+        self.host_profiles = tuple(host.vuln_profile.name for host in hosts)
+
+    def get_host_names(self):
+        return list(self.names)
+
+    def diff(self, host_gen):
+        """
+        Returns the delta from this snapshot to the current state of host_gen:
+        the (profile, vulnerability) pairs and 'host->other' edges removed
+        since, and the (host index, profile) pairs of reassigned hosts
+        """
+        hosts = host_gen.get_hosts()
+        reassigned = tuple((i, host.vuln_profile.name) for (i, host) in enumerate(hosts)
+                           if host.vuln_profile.name != self.host_profiles[i])
+
+        removed_vulns = []
+        for name in sorted(set(host.vuln_profile.name for host in hosts)):
+            profile = [host.vuln_profile for host in hosts if host.vuln_profile.name == name][0]
+            if name not in self.profiles:
+                raise ValueError(''.join([name, ' is not part of the topology snapshot!']))
+            current = set(vuln.name for vuln in profile.get_vulnerabilities())
+            base = [vuln.name for vuln in self.profiles[name][0]]
+            if not current.issubset(base):
+                raise ValueError(''.join([name, ' gained vulnerabilities since the topology snapshot!']))
+            removed_vulns.extend((name, vuln) for vuln in base if vuln not in current)
+
+        removed_edges = []
+        for (i, host) in enumerate(hosts):
+            if not set(host.outgoing).issubset(self.outgoing[i]):
+                raise ValueError(''.join([host.name, ' gained connections since the topology snapshot!']))
+            removed_edges.extend(host.name + '->' + other for other in self.outgoing[i]
+                                 if other not in host.outgoing)
+
+        return (tuple(removed_vulns), tuple(removed_edges), reassigned)
+
+    def apply(self, delta):
+        """
+        Returns a new snapshot with a delta produced by diff applied
+        """
+        removed_vulns, removed_edges, reassigned = delta
+        snapshot = copy.copy(self)
+
+        removed = defaultdict(set)
+        for (profile, vuln) in removed_vulns:
+            removed[profile].add(vuln)
+        snapshot.profiles = dict(self.profiles)
+        for (profile, vulns) in removed.items():
+            vuln_list = tuple(vuln for vuln in self.profiles[profile][0] if vuln.name not in vulns)
+            snapshot.profiles[profile] = (vuln_list, tuple(class_probabilities(vuln_list)))
+
+        removed = defaultdict(set)
+        for edge in removed_edges:
+            (host, other) = edge.split('->')
+            removed[host].add(other)
+        snapshot.outgoing = tuple(tuple(other for other in outgoing if other not in removed[name])
+                                  if name in removed else outgoing
+                                  for (name, outgoing) in zip(self.names, self.outgoing))
+
+        host_profiles = list(self.host_profiles)
+        for (i, profile) in reassigned:
+            host_profiles[i] = profile
+        snapshot.host_profiles = tuple(host_profiles)
+
+        return snapshot
+
+    def sample_hosts(self, rng, collapsed=False):
+        """
+        Samples the vulnerabilities (only their exploit classes if collapsed)
+        and access levels of every host for one trial, drawing from the
+        TrialRNG rng of the trial
+        """
+        hosts = []
+        for i in range(len(self.names)):
+            host = TrialHost(self.names[i], self.types[i], self.outgoing[i], list(self.access_levels[i]))
+            vuln_list, class_probs = self.profiles[self.host_profiles[i]]
+            if collapsed:
+                for (c, prob) in enumerate(class_probs):
+                    if rng.uniform(EXPLOIT_CLASS, i, c) < prob:
+                        host.exploit_classes |= 1 << c
+            else:
+                host.vulnerabilities = [vuln for vuln in vuln_list
+                                        if rng.uniform(VULNERABILITY, i, vuln.index) <= vuln.probabilty]
+                for vuln in host.vulnerabilities:
+                    host.exploit_classes |= 1 << vuln.exploit_class
+            for (level, prob) in self.access_probs:
+                if level != 'NETWORK' and rng.uniform(ACCESS_LEVEL, i, name_key(level)) <= prob:
+                    host.access_levels.append(level)
+            hosts.append(host)
+
+        if self.topology == 'GEN-1':
+            grant_vpn_access(hosts)
+
+        return hosts
@@ -0,0 +1,121 @@
+"""
+trial_race.py
+
+Sequential allocation of the trials of a round among its candidates. A
+candidate stops once its Wilson score interval lies above the lowest upper
+bound of the round.
+"""
+
+import math
+
+import numpy as np
+
+def normal_quantile(p):
+    """
+    Inverse of the standard normal distribution function, by bisection
+    """
+    low, high = -10.0, 10.0
+    for _ in range(100):
+        middle = (low + high) / 2
+        if 0.5 * (1 + math.erf(middle / math.sqrt(2))) < p:
+            low = middle
+        else:
+            high = middle
+    return (low + high) / 2
+
+def wilson_interval(successes, trials, z):
+    """
+    Returns the (lower, upper) Wilson score interval of a proportion
+    """
+    if trials == 0:
+        return (0.0, 1.0)
+    p = float(successes) / trials
+    denominator = 1 + z * z / trials
+    center = (p + z * z / (2 * trials)) / denominator
+    half_width = z * math.sqrt(p * (1 - p) / trials + z * z / (4.0 * trials * trials)) / denominator
+    return (max(0.0, center - half_width), min(1.0, center + half_width))
+
+def paired_difference(reference, outcomes):
+    """
+    Returns the mean of reference - outcomes over the trials both ran, its
+    standard error and the number of those trials
+    """
+    common = (reference >= 0) & (outcomes >= 0)
+    trials = int(common.sum())
+    if trials == 0:
+        return (0.0, 0.0, 0)
+    differences = reference[common].astype(float) - outcomes[common]
+    error = differences.std(ddof=1) / math.sqrt(trials) if trials > 1 else 0.0
+    return (differences.mean(), error, trials)
+
+class RoundResults(list):
+    """
+    The number of vulnerable configurations of each candidate of a round,
+    as sent to the optimizers, which also carries the outcomes of each
+    candidate by trial number: 1 if vulnerable, 0 if not, -1 if not run
+    """
+    def __init__(self, counts, outcomes):
+        list.__init__(self, counts)
+        self.outcomes = outcomes
+
+class TrialRace(object):
+    """
+    Tracks the trials of the candidates of one round. error_rate bounds the
+    chance of stopping any candidate which is no worse than the incumbent.
+    If fractional, outcomes are probabilities rather than 0 or 1.
+    """
+    def __init__(self, candidates, trials, batch_size=None, error_rate=None, fractional=False):
+        self.trials = trials
+        self.batch_size = trials
+        self.fractional = fractional
+        self.successes = [0] * candidates
+        self.runs = [0] * candidates
+        self.queued = [0] * candidates
+        self.outcomes = np.full((candidates, trials), -1, dtype=float if fractional else np.int8)
+        self.z = None
+        if error_rate is not None and candidates > 1:
+            self.batch_size = min(batch_size or trials, trials)
+            looks = -(-trials // self.batch_size)
+            self.z = normal_quantile(1 - error_rate / (2.0 * candidates * looks))
+
+    def record(self, candidate, first, outcomes):
+        """
+        Records the outcomes of the trials of candidate numbered from first
+        """
+        self.outcomes[candidate, first:first + len(outcomes)] = outcomes
+        if self.fractional:
+            self.successes[candidate] += float(np.sum(outcomes))
+        else:
+            self.successes[candidate] += int(np.count_nonzero(outcomes))
+        self.runs[candidate] += len(outcomes)
+
+    def stopped(self, candidate):
+        """
+        Returns whether candidate is worse than the incumbent
+        """
+        if self.z is None:
+            return False
+        best = min(wilson_interval(s, n, self.z)[1] for (s, n) in zip(self.successes, self.runs))
+        return wilson_interval(self.successes[candidate], self.runs[candidate], self.z)[0] > best
+
+    def next_batch(self, candidate):
+        """
+        Returns the numbers of the trials to run next for candidate, none
+        once it is done
+        """
+        if self.stopped(candidate):
+            return []
+        first = self.queued[candidate]
+        self.queued[candidate] = min(first + self.batch_size, self.trials)
+        return range(first, self.queued[candidate])
+
+    def estimates(self):
+        """
+        Returns the number of vulnerable configurations of each candidate,
+        scaled up from the trials it ran to the full number of trials
+        """
+        return [float(s) * self.trials / n if n < self.trials else s
+                for (s, n) in zip(self.successes, self.runs)]
+
+    def results(self):
+        return RoundResults(self.estimates(), list(self.outcomes))
@@ -0,0 +1,89 @@
+"""
+trial_rng.py
+
+Counter-based random draws for evaluation trials. Every draw hashes the run
+seed, the trial, the kind of draw, the host and a key (e.g. the row of a
+vulnerability), so every candidate sees the same configuration in trial t.
+"""
+
+import zlib
+
+import numpy as np
+
+MASK = (1 << 64) - 1
+
+# Kinds of draws
+VULNERABILITY = 1
+EXPLOIT_CLASS = 2
+ACCESS_LEVEL = 3
+FILE_HOST = 4
+
+def mix64(x):
+    """
+    The splitmix64 finalizer, a bijection on 64 bit integers
+    """
+    x = (x + 0x9E3779B97F4A7C15) & MASK
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & MASK
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & MASK
+    return x ^ (x >> 31)
+
+def mix64_array(x):
+    """
+    mix64 over a uint64 array, wrapping around like the masked version
+    """
+    x = x + np.uint64(0x9E3779B97F4A7C15)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+def name_key(name):
+    """
+    Returns the key of a named item, stable across processes and runs
+    """
+    return zlib.crc32(name) & 0xffffffff
+
+def trial_prefix(seed, trial):
+    return mix64(mix64(seed & MASK) ^ trial)
+
+def draw_word(kind, host, key):
+    return (kind << 56) | (host << 32) | key
+
+def to_unit(x):
+    # The top 53 bits, as a float in [0, 1)
+    return (x >> 11) * 2.0 ** -53
+
+class TrialRNG(object):
+    """
+    The draws of one trial of a run
+    """
+    def __init__(self, seed, trial):
+        self.prefix = trial_prefix(seed, trial)
+
+    def uniform(self, kind, host, key=0):
+        return to_unit(mix64(self.prefix ^ draw_word(kind, host, key)))
+
+    def choice(self, seq):
+        """
+        Draws the host holding the file from seq
+        """
+        return seq[int(self.uniform(FILE_HOST, 0) * len(seq))]
+
+def uniforms(seed, first, trials, kind, hosts, keys):
+    """
+    Returns the draws of trials first, ..., first + trials - 1 for every
+    host index in hosts and every key in keys, as an array of shape
+    (trials, hosts, keys)
+    """
+    prefixes = np.array([trial_prefix(seed, trial) for trial in range(first, first + trials)], dtype=np.uint64)
+    words = np.array([[draw_word(kind, host, key) for key in keys] for host in hosts],
+                     dtype=np.uint64).reshape(len(hosts), len(keys))
+    x = mix64_array(prefixes[:, np.newaxis, np.newaxis] ^ words[np.newaxis])
+    return (x >> np.uint64(11)).astype(np.float64) * 2.0 ** -53
+
+def file_host_indices(seed, first, trials, num_hosts):
+    """
+    Returns the index of the host holding the file in each trial, the same
+    as TrialRNG.choice over num_hosts hosts
+    """
+    draws = uniforms(seed, first, trials, FILE_HOST, [0], [0])[:, 0, 0]
+    return (draws * num_hosts).astype(np.intp)
@@ -1,33 +1,196 @@
+import hashlib
 import os
-import pickle
-import untangle
+import sqlite3
+import xml.etree.cElementTree as ElementTree
+
+from multiprocessing import Pool, cpu_count
 
 REPO = os.path.join('..', 'NVD')
+STORE_FILE = 'vuln_dict.db'
+# The pickled dictionary of earlier versions, which is not a feed
+LEGACY_FILE = 'vuln_dict'
+# Bumped whenever the layout of the store changes, older stores are rebuilt
+STORE_VERSION = 1
+
+# The CVSS base metrics kept in the store, the ones VulnProfile uses, as
+# (column, metric) pairs. The feeds name the elements like the columns, with
+# dashes instead of underscores.
+CVSS_COLUMNS = [('access_vector', 'Access Vector'),
+                ('authentication', 'Authentication'),
+                ('access_complexity', 'Access Complexity'),
+                ('confidentiality_impact', 'Confidentiality Impact')]
+COLUMNS = ', '.join(['id', 'published_date', 'cwe'] + [column for (column, _) in CVSS_COLUMNS])
 
 def main():
     a = VulnDict()
     a.parse_zero_day()
 
+def local_name(tag):
+    return tag.rsplit('}', 1)[-1]
+
+def parse_feed(feed_path):
+    """
+    Yields the (id, published date, cwe, cvss metrics...) row of every entry
+    with CVSS metrics in an NVD feed. The feed is parsed incrementally and
+    every entry is discarded once read, so memory does not grow with the
+    size of the feed.
+    """
+    context = ElementTree.iterparse(feed_path, events=('start', 'end'))
+    (_, root) = next(context)
+    for (event, elem) in context:
+        if event != 'end' or local_name(elem.tag) != 'entry':
+            continue
+        children = dict((local_name(child.tag), child) for child in elem)
+        metrics = [metrics for cvss in elem if local_name(cvss.tag) == 'cvss'
+                   for metrics in cvss if local_name(metrics.tag) == 'base_metrics']
+        if metrics:
+            values = dict((local_name(metric.tag), metric.text) for metric in metrics[0])
+            # Entries listing several weaknesses are recorded without a CWE
+            cwes = [child for child in elem if local_name(child.tag) == 'cwe']
+            cwe = cwes[0].get('id') if len(cwes) == 1 else ''
+            yield ((children['cve-id'].text, children['published-datetime'].text, cwe) +
+                   tuple(values.get(column.replace('_', '-')) for (column, _) in CVSS_COLUMNS))
+        elem.clear()
+        root.clear()
+
+def checksum(path):
+    sha1 = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), ''):
+            sha1.update(block)
+    return sha1.hexdigest()
+
+def ingest_feed(task):
+    """
+    Returns the checksum of a feed and its rows, or None instead of the rows
+    if the checksum matches the one the feed was last ingested with
+    """
+    (feed_path, known_checksum) = task
+    feed_checksum = checksum(feed_path)
+    if feed_checksum == known_checksum:
+        return (feed_checksum, None)
+    return (feed_checksum, list(parse_feed(feed_path)))
+
+def open_store(store_loc):
+    """
+    Opens the store at store_loc, creating it or replacing a store with an
+    older layout
+    """
+    connection = sqlite3.connect(store_loc, timeout=600, isolation_level=None)
+    connection.text_factory = str
+    connection.execute('BEGIN IMMEDIATE')
+    try:
+        if connection.execute('PRAGMA user_version').fetchone()[0] != STORE_VERSION:
+            connection.execute('DROP TABLE IF EXISTS vulns')
+            connection.execute('DROP TABLE IF EXISTS feeds')
+            connection.execute('CREATE TABLE vulns (id TEXT PRIMARY KEY, feed TEXT, published_date TEXT, cwe TEXT, ' +
+                               ', '.join(column + ' TEXT' for (column, _) in CVSS_COLUMNS) + ')')
+            connection.execute('CREATE INDEX vulns_feed ON vulns (feed)')
+            connection.execute('CREATE TABLE feeds (name TEXT PRIMARY KEY, size INTEGER, mtime REAL, checksum TEXT)')
+            connection.execute('PRAGMA user_version = %d' % STORE_VERSION)
+        connection.execute('COMMIT')
+    except:
+        connection.execute('ROLLBACK')
+        raise
+    return connection
+
+def update_store(connection, repo):
+    """
+    Brings the store up to date with the feeds in repo. Only feeds which are
+    new or whose checksum changed since they were last ingested are parsed,
+    in parallel, and the entries of removed feeds are dropped.
+    """
+    known = dict((row[0], row[1:]) for row in connection.execute('SELECT name, size, mtime, checksum FROM feeds'))
+    feeds = {}
+    for f in os.listdir(repo):
+        if f.startswith('.') or f.startswith(STORE_FILE) or f == LEGACY_FILE:
+            continue
+        stat = os.stat(os.path.join(repo, f))
+        feeds[f] = (stat.st_size, stat.st_mtime)
+    # Feeds whose size and modification time are unchanged are not read at all
+    stale = sorted(f for f in feeds if f not in known or known[f][:2] != feeds[f])
+    removed = [f for f in known if f not in feeds]
+    if not stale and not removed:
+        return
+
+    tasks = [(os.path.join(repo, f), known[f][2] if f in known else None) for f in stale]
+    if len(tasks) > 1:
+        pool = Pool(min(cpu_count(), len(tasks)))
+        results = pool.map(ingest_feed, tasks)
+        pool.close()
+        pool.join()
+    else:
+        results = map(ingest_feed, tasks)
+
+    connection.execute('BEGIN IMMEDIATE')
+    try:
+        for f in removed:
+            connection.execute('DELETE FROM vulns WHERE feed = ?', (f,))
+            connection.execute('DELETE FROM feeds WHERE name = ?', (f,))
+        for (f, (feed_checksum, rows)) in zip(stale, results):
+            if rows is not None:
+                print 'Ingesting NVD feed:', f
+                connection.execute('DELETE FROM vulns WHERE feed = ?', (f,))
+                connection.executemany('INSERT OR REPLACE INTO vulns (id, feed, published_date, cwe, ' +
+                                       ', '.join(column for (column, _) in CVSS_COLUMNS) + ') VALUES (' +
+                                       ', '.join('?' * (4 + len(CVSS_COLUMNS))) + ')',
+                                       (row[:1] + (f,) + row[1:] for row in rows))
+            connection.execute('INSERT OR REPLACE INTO feeds (name, size, mtime, checksum) VALUES (?, ?, ?, ?)',
+                               (f,) + feeds[f] + (feed_checksum,))
+        connection.execute('COMMIT')
+    except:
+        connection.execute('ROLLBACK')
+        raise
+
+class VulnStore(object):
+    """
+    Read-only mapping from CVE ids to VulnEntry objects backed by an SQLite
+    store. Entries are only read when first looked up, so a profile touches
+    just the CVEs of its report, and the pages of the file are shared by all
+    processes through the page cache.
+    """
+    def __init__(self, connection):
+        self.connection = connection
+        self.entries = {}
+
+    def get(self, vuln_id, default=None):
+        if vuln_id not in self.entries:
+            row = self.connection.execute('SELECT ' + COLUMNS + ' FROM vulns WHERE id = ?', (vuln_id,)).fetchone()
+            self.entries[vuln_id] = None if row is None else self.entry(row)
+        entry = self.entries[vuln_id]
+        return default if entry is None else entry
+
+    def __contains__(self, vuln_id):
+        return self.get(vuln_id) is not None
+
+    def __getitem__(self, vuln_id):
+        entry = self.get(vuln_id)
+        if entry is None:
+            raise KeyError(vuln_id)
+        return entry
+
+    def __len__(self):
+        return self.connection.execute('SELECT COUNT(*) FROM vulns').fetchone()[0]
+
+    def values(self):
+        return [self.entry(row) for row in self.connection.execute('SELECT ' + COLUMNS + ' FROM vulns')]
+
+    def get_feeds(self):
+        """
+        Returns the (name, checksum) pairs of the feeds in the store
+        """
+        return self.connection.execute('SELECT name, checksum FROM feeds ORDER BY name').fetchall()
+
+    @staticmethod
+    def entry(row):
+        cvss = dict((metric, value) for ((_, metric), value) in zip(CVSS_COLUMNS, row[3:]))
+        return VulnEntry(row[0], cvss, row[1], row[2])
+
 class VulnDict(object):
-    def __init__(self):
-        self.vuln_dict = dict()
-        dict_loc = os.path.join(REPO, 'vuln_dict')
-        if not os.path.isfile(dict_loc):
-            for f in os.listdir(REPO):
-                file_path = os.path.join(REPO, f)
-                converted_xml = untangle.parse(file_path)
-                
-                for entry in converted_xml.nvd.entry:
-                    if not hasattr(entry, 'vuln_cvss'):
-                        continue
-                    cve_id = entry.vuln_cve_id
-                    cvss = entry.vuln_cvss
-                    cwe = entry.vuln_cwe if hasattr(entry, 'vuln_cwe') else None
-                    published_date = entry.vuln_published_datetime
-                    self.vuln_dict[entry['id']] = VulnEntry(cve_id, cvss, published_date, cwe)
-            pickle.dump(self.vuln_dict, open(dict_loc, 'w'))
-        else:
-            self.vuln_dict = pickle.load(open(dict_loc, 'r'))
+    def __init__(self, repo=REPO):
+        connection = open_store(os.path.join(repo, STORE_FILE))
+        update_store(connection, repo)
+        self.vuln_dict = VulnStore(connection)
 
     def parse_zero_day(self):
         vuln_count = {}
@@ -55,25 +218,10 @@ class VulnDict(object):
 
 class VulnEntry(object):
     def __init__(self, vuln_id, cvss, published_date, cwe):
-        self.id = vuln_id.cdata
-        self.cvss = self.parse_cvss(cvss.cvss_base_metrics)
-        self.published_date = published_date.cdata
-        try:
-            self.cwe = '' if cwe is None else cwe['id']
-        except TypeError:
-            self.cwe = ''
- 
-    def parse_cvss(self, cvss):
-        cvss_dict = dict()
-        cvss_dict['Score'] = cvss.cvss_score.cdata
-        cvss_dict['Access Complexity'] = cvss.cvss_access_complexity.cdata
-        cvss_dict['Access Vector'] = cvss.cvss_access_vector.cdata
-        cvss_dict['Authentication'] = cvss.cvss_authentication.cdata
-        cvss_dict['Availability Impact'] = cvss.cvss_availability_impact.cdata
-        cvss_dict['Confidentiality Impact'] = cvss.cvss_confidentiality_impact.cdata
-        cvss_dict['Integrity Impact'] = cvss.cvss_integrity_impact.cdata
-        
-        return cvss_dict
+        self.id = vuln_id
+        self.cvss = cvss
+        self.published_date = published_date
+        self.cwe = cwe
 
 if __name__ == "__main__":
     main()
@@ -4,46 +4,187 @@ Created on Feb 15, 2017
 @author: Michael
 '''
 
+import copy
+import numpy as np
+
+from collections import defaultdict
 from vuln_dict import VulnDict, VulnEntry
 
+# Access predicates an exploit can require, in the order used to number the
+# exploit precondition classes (access vector x authentication requirement)
+ACCESS_VECTORS = ['LOCAL', 'ADJACENT', 'NETWORK']
+NUM_EXPLOIT_CLASSES = 2 * len(ACCESS_VECTORS)
+
+def exploit_class(min_av, req_auth):
+    '''
+    Returns the precondition class of an exploit. Follows the branching of
+    action_exploit in the planner: anything which is neither LOCAL nor
+    ADJACENT is exploited through network access.
+    '''
+    if min_av == 'LOCAL':
+        av = 0
+    elif min_av == 'ADJACENT':
+        av = 1
+    else:
+        av = 2
+    return 2 * av + (1 if req_auth == 'YES' else 0)
+
+def exploit_class_name(c):
+    '''
+    Returns the name of an exploit class, e.g. NETWORK-NOAUTH
+    '''
+    return '-'.join([ACCESS_VECTORS[c // 2], 'AUTH' if c % 2 else 'NOAUTH'])
+
+def class_probabilities(vuln_list):
+    '''
+    Returns, per exploit class, the probability that at least one of the
+    vulnerabilities of that class is sampled
+    '''
+    absent = [1.0] * NUM_EXPLOIT_CLASSES
+    for vuln in vuln_list:
+        absent[vuln.exploit_class] *= 1.0 - vuln.probabilty
+    return [1.0 - prob for prob in absent]
+
 
 class VulnProfile(object):
+    '''
+    Stores its vulnerabilities column-wise, in parallel lists and arrays with
+    an active mask. Removing and re-adding a vulnerability only flips its
+    mask entry and the filters operate on whole columns. Vulnerability
+    objects are views of a single row.
+    '''
     def __init__(self, parsed_report, vd, name):
         self.name =  name
-        self.vuln_list = []
-        duplicate_list = []
+        self.names = []
+        self.cwes = []
+        self.published_dates = []
+        self.min_avs = []
+        self.confidentiality = []
+        probabilities = []
+        auth = []
+        duplicates = set()
         
-        for entry in parsed_report[1:]:
+        # The report may be any iterable of (CVE, plugin name) pairs, e.g. one
+        # streamed by NessusParser
+        for entry in parsed_report:
             if entry[0] not in vd.vuln_dict:
                 continue
             vuln = vd.vuln_dict[entry[0]]
             # Ignore vulnerabilities which do not have confidentiality
             if vuln.cvss['Confidentiality Impact'] == 'NONE':
                 continue
-            if entry[1].split(':')[0] in duplicate_list:
+            if entry[1].split(':')[0] in duplicates:
                 continue
             else:
-                duplicate_list.append(entry[1].split(':')[0])
-            name = vuln.id
-            cwe = vuln.cwe
-            published_date = vuln.published_date
-            min_av = vuln.cvss['Access Vector']
-            req_auth = 'NO' if vuln.cvss['Authentication'] == 'NONE' else 'YES'
-            conf = vuln.cvss['Confidentiality Impact']
-            probability = self.determine_probability(vuln)
-            self.vuln_list.append(Vulnerability(name, min_av, req_auth, conf, probability, cwe, published_date))
-        print("Vulnerability profile contains " + str(len(self.vuln_list)) + " vulnerabilities")
+                duplicates.add(entry[1].split(':')[0])
+            self.names.append(vuln.id)
+            self.cwes.append(vuln.cwe)
+            self.published_dates.append(vuln.published_date)
+            self.min_avs.append(vuln.cvss['Access Vector'])
+            self.confidentiality.append(vuln.cvss['Confidentiality Impact'])
+            auth.append(vuln.cvss['Authentication'] != 'NONE')
+            probabilities.append(self.determine_probability(vuln))
+
+        self.probabilities = np.array(probabilities, dtype=float)
+        self.auth = np.array(auth, dtype=bool)
+        self.active = np.ones(len(self.names), dtype=bool)
+        self.update_columns()
+        print("Vulnerability profile contains " + str(len(self.names)) + " vulnerabilities")
+
+    def update_columns(self):
+        '''
+        Derives the access vector codes, exploit classes and years from the
+        stored columns
+        '''
+        self.av_codes = np.array([exploit_class(av, 'NO') // 2 for av in self.min_avs], dtype=np.int8)
+        self.exploit_classes = 2 * self.av_codes + self.auth
+        self.years = np.array([int(name.split('-')[1]) for name in self.names], dtype=np.int16)
+        self.published_years = np.array([int(date.split('-')[0]) for date in self.published_dates], dtype=np.int16)
+        self.update_views()
+
+    def update_views(self):
+        '''
+        Creates the row views and the index of the rows of each name
+        '''
+        self.vulns = [Vulnerability(self, i) for i in range(len(self.names))]
+        self.rows = defaultdict(list)
+        for (i, name) in enumerate(self.names):
+            self.rows[name].append(i)
+        self.update_class_probabilities()
+
+    @classmethod
+    def from_columns(cls, name, columns, class_probs=None):
+        '''
+        Creates a profile from the columns of another, e.g. those stored in a
+        profile bundle, with all rows active
+        '''
+        profile = cls.__new__(cls)
+        profile.name = name
+        for (column, values) in columns.items():
+            setattr(profile, column, values)
+        profile.active = np.ones(len(profile.names), dtype=bool)
+        profile.update_views()
+        profile.class_probs = class_probs
+        return profile
+
+    def copy(self):
+        '''
+        Returns a profile sharing the arrays of this one, which can be
+        filtered and changed independently
+        '''
+        profile = copy.copy(self)
+        for column in ['names', 'cwes', 'published_dates', 'min_avs', 'confidentiality']:
+            setattr(profile, column, list(getattr(self, column)))
+        profile.active = self.active.copy()
+        profile.update_views()
+        return profile
+
+    @property
+    def vuln_list(self):
+        return self.get_vulnerabilities()
 
     def get_vulnerabilities(self):
-        return self.vuln_list
+        return [self.vulns[i] for i in np.flatnonzero(self.active)]
+
+    def get_class_probabilities(self):
+        if self.class_probs is None:
+            absent = np.ones(NUM_EXPLOIT_CLASSES)
+            np.multiply.at(absent, self.exploit_classes[self.active], 1.0 - self.probabilities[self.active])
+            self.class_probs = (1.0 - absent).tolist()
+        return self.class_probs
 
     def add_vulnerability(self, vuln):
-        self.vuln_list.append(vuln)
+        if isinstance(vuln, Vulnerability) and vuln.profile is self:
+            self.active[vuln.index] = True
+            self.update_class_probabilities()
+            return
+        self.names.append(vuln.name)
+        self.cwes.append(vuln.cwe)
+        self.published_dates.append(vuln.published_date)
+        self.min_avs.append(vuln.min_av)
+        self.confidentiality.append(vuln.confidentiality)
+        self.probabilities = np.append(self.probabilities, vuln.probabilty)
+        self.auth = np.append(self.auth, vuln.req_auth == 'YES')
+        self.active = np.append(self.active, True)
+        self.update_columns()
 
     def remove_vulnerability(self, vuln_name):
-        for vuln in self.vuln_list:
-            if vuln.name == vuln_name:
-                self.vuln_list.remove(vuln)
+        '''
+        Deactivates every row of vuln_name and returns the views of those
+        which were active, for add_vulnerability to restore
+        '''
+        rows = [i for i in self.rows.get(vuln_name, []) if self.active[i]]
+        self.active[rows] = False
+        self.update_class_probabilities()
+        return [self.vulns[i] for i in rows]
+
+    def update_class_probabilities(self):
+        '''
+        Invalidates the per exploit class probabilities that a host with this
+        profile samples at least one vulnerability of that class, they are
+        recomputed on the next get_class_probabilities
+        '''
+        self.class_probs = None
 
     def determine_probability(self, vuln):
         prob = 1.0
@@ -67,25 +208,14 @@ class VulnProfile(object):
         return prob
 
     def exclude_year(self, year):
-        vuln_list = []
-        for vuln in self.vuln_list:
-            vuln_name = vuln.name.split('-')
-            if vuln_name[1] not in year:
-                vuln_list.append(vuln)
-
-        self.vuln_list = vuln_list
-        print("Filtered vulnerability profile contains " + str(len(self.vuln_list)) + " vulnerabilities")
+        self.active &= ~np.in1d(self.years, [int(y) for y in year])
+        self.update_class_probabilities()
+        print("Filtered vulnerability profile contains " + str(np.count_nonzero(self.active)) + " vulnerabilities")
 
     def filter_zero_day(self):
-        vuln_list = []
-        for vuln in self.vuln_list:
-            date = vuln.name.split('-')[1]
-            pub_date = vuln.published_date.split('-')[0]
-            if date == pub_date:
-                vuln_list.append(vuln)
-
-        self.vuln_list = vuln_list
-        print("Filtered vulnerability profile contains " + str(len(self.vuln_list)) + " vulnerabilities")
+        self.active &= self.years == self.published_years
+        self.update_class_probabilities()
+        print("Filtered vulnerability profile contains " + str(np.count_nonzero(self.active)) + " vulnerabilities")
 
 #     def count_zero_day(self):
 #         vuln_list = []
@@ -99,11 +229,49 @@ class VulnProfile(object):
 #         print("Profile zero-day proportion: " + str(proportion))
 
 class Vulnerability(object):
-    def __init__(self, name, min_av, req_auth, conf, probability, cwe, pub_date):
-        self.name = name
-        self.min_av = min_av
-        self.req_auth = req_auth
-        self.probabilty = probability
-        self.confidentiality = conf
-        self.cwe = cwe
-        self.published_date = pub_date
\ No newline at end of file
+    '''
+    View of one row of a VulnProfile
+    '''
+    __slots__ = ['profile', 'index']
+
+    def __init__(self, profile, index):
+        self.profile = profile
+        self.index = index
+
+    def __getstate__(self):
+        return (self.profile, self.index)
+
+    def __setstate__(self, state):
+        (self.profile, self.index) = state
+
+    @property
+    def name(self):
+        return self.profile.names[self.index]
+
+    @property
+    def min_av(self):
+        return self.profile.min_avs[self.index]
+
+    @property
+    def req_auth(self):
+        return 'YES' if self.profile.auth[self.index] else 'NO'
+
+    @property
+    def probabilty(self):
+        return float(self.profile.probabilities[self.index])
+
+    @property
+    def confidentiality(self):
+        return self.profile.confidentiality[self.index]
+
+    @property
+    def cwe(self):
+        return self.profile.cwes[self.index]
+
+    @property
+    def published_date(self):
+        return self.profile.published_dates[self.index]
+
+    @property
+    def exploit_class(self):
+        return int(self.profile.exploit_classes[self.index])
\ No newline at end of file
@@ -0,0 +1,146 @@
+"""
+witness_cache.py
+
+Reuses the outcomes of evaluation trials across candidates. Removals only
+take attack paths away, so a trial is only solved again if its witness, a
+frozenset of 'host->other' connections and (host, exploit) pairs, uses what
+was removed.
+"""
+
+from collections import OrderedDict
+
+from vuln_profile import NUM_EXPLOIT_CLASSES, exploit_class_name
+
+CLASS_NAMES = dict((exploit_class_name(c).upper(), c) for c in range(NUM_EXPLOIT_CLASSES))
+
+# Returned by WitnessCache.lookup for trials which have to be solved
+MISSING = object()
+
+def plan_witness(plan_file):
+    """
+    Returns the witness of a plan written by Fast Downward, whose action
+    names may have been lowercased by the translator
+    """
+    witness = set()
+    with open(plan_file) as f:
+        for line in f:
+            if not line.startswith('('):
+                continue
+            parts = line.strip()[1:-1].split()
+            action = parts[0].upper()
+            if action == 'UPDATE_ACCESS':
+                witness.add(parts[1] + '->' + parts[2])
+            elif action.startswith('EXPLOIT-'):
+                witness.add((parts[1], CLASS_NAMES[action[len('EXPLOIT-'):]]))
+            elif action != 'ACCESS':
+                witness.add((parts[1], action))
+    return frozenset(witness)
+
+def common_base(deltas):
+    """
+    Returns the delta which each of several deltas removes at most one more
+    element from, or None if there is no such delta
+    """
+    if len(deltas) < 2 or len(set(delta[2] for delta in deltas)) > 1:
+        return None
+    (removed_vulns, removed_edges, reassigned) = deltas[0]
+    base = (tuple(vuln for vuln in removed_vulns if all(vuln in delta[0] for delta in deltas)),
+            tuple(edge for edge in removed_edges if all(edge in delta[1] for delta in deltas)),
+            reassigned)
+    size = len(base[0]) + len(base[1])
+    if any(len(delta[0]) + len(delta[1]) > size + 1 for delta in deltas):
+        return None
+    return base
+
+class WitnessCache(object):
+    """
+    The (outcome, witness) of the trials of recently evaluated deltas from a
+    TopologySnapshot (see TopologySnapshot.diff), with witness None for
+    trials which were not vulnerable. Holds at most capacity trials, dropping
+    the deltas used least recently.
+    """
+    def __init__(self, snapshot, capacity):
+        self.snapshot = snapshot
+        self.capacity = capacity
+        self.index = dict((name, i) for (i, name) in enumerate(snapshot.names))
+        self.deltas = OrderedDict()
+        self.size = 0
+        self.classes = {}
+
+    def __contains__(self, delta):
+        return delta in self.deltas
+
+    def store(self, delta, trial, witness, outcome=1):
+        if witness is None:
+            outcome = 0
+        if delta not in self.deltas:
+            self.deltas[delta] = {}
+        trials = self.deltas[delta]
+        if trial not in trials:
+            self.size += 1
+        trials[trial] = (outcome, witness)
+        while self.size > self.capacity and len(self.deltas) > 1:
+            (_, dropped) = self.deltas.popitem(last=False)
+            self.size -= len(dropped)
+
+    def base(self, delta):
+        """
+        Returns (base, element) for a cached base delta which delta only
+        removes element from, a (profile, vulnerability) pair or a connection,
+        with element None if delta itself is cached. Returns None if there is
+        no such delta.
+        """
+        if delta in self.deltas:
+            return (delta, None)
+        (removed_vulns, removed_edges, reassigned) = delta
+        for (i, vuln) in enumerate(removed_vulns):
+            base = (removed_vulns[:i] + removed_vulns[i + 1:], removed_edges, reassigned)
+            if base in self.deltas:
+                return (base, vuln)
+        for (i, edge) in enumerate(removed_edges):
+            base = (removed_vulns, removed_edges[:i] + removed_edges[i + 1:], reassigned)
+            if base in self.deltas:
+                return (base, edge)
+        return None
+
+    def lookup(self, base, element, trial):
+        """
+        Returns the (outcome, witness) trial had for base if it still holds
+        without element, or MISSING if the trial has to be solved again
+        """
+        trials = self.deltas.get(base, {})
+        if trial not in trials:
+            return MISSING
+        (outcome, witness) = trials[trial]
+        if witness is None or element is None or not self.touches(base, element, witness):
+            return (outcome, witness)
+        return MISSING
+
+    def touch(self, delta):
+        """
+        Marks delta as used
+        """
+        if delta in self.deltas:
+            self.deltas[delta] = self.deltas.pop(delta)
+
+    def touches(self, base, element, witness):
+        """
+        Whether removing element from base can break an attack with witness
+        """
+        if isinstance(element, str):
+            return element in witness
+        (profile, vuln) = element
+        if (profile, vuln) not in self.classes:
+            self.classes[(profile, vuln)] = [v.exploit_class for v in self.snapshot.profiles[profile][0]
+                                             if v.name == vuln][0]
+        exploits = (vuln.upper(), self.classes[(profile, vuln)])
+
+        host_profiles = list(self.snapshot.host_profiles)
+        for (i, name) in base[2]:
+            host_profiles[i] = name
+        for item in witness:
+            if isinstance(item, tuple) and host_profiles[self.index[item[0]]] == profile:
+                exploit = item[1].upper() if isinstance(item[1], str) else item[1]
+                if exploit in exploits:
+                    return True
+        return False
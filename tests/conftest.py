@@ -0,0 +1,82 @@
+"""
+Shared fixtures: small vulnerability profiles built from a fake NVD
+dictionary and generated topologies, seeded so every run is the same.
+"""
+
+import imp
+import os
+import random
+import sys
+
+import pytest
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+sys.path.insert(0, SRC_DIR)
+
+from host_generator import HostGenerator
+from vuln_profile import VulnProfile
+
+ACCESS_PROBS = {'NETWORK': 0.3, 'ROOT': 0.05, 'USER': 0.15}
+
+class FakeEntry(object):
+    def __init__(self, id, cvss):
+        self.id = id
+        self.cwe = ''
+        self.published_date = '2014-01-01'
+        self.cvss = cvss
+
+class FakeVulnDict(object):
+    def __init__(self):
+        self.vuln_dict = {}
+
+def make_profiles(size=10, duplicates=0):
+    """
+    Returns four profiles of size vulnerabilities each, of every access
+    vector, authentication and complexity. The first duplicates of them are
+    listed a second time by another plugin.
+    """
+    rng = random.Random(size)
+    profiles = []
+    for k in range(4):
+        vd = FakeVulnDict()
+        report = []
+        for i in range(size):
+            entry = FakeEntry('CVE-2014-%04d' % (1000 * k + i),
+                              {'Access Vector': rng.choice(['LOCAL', 'ADJACENT', 'NETWORK', 'NETWORK']),
+                               'Authentication': rng.choice(['NONE', 'SINGLE', 'MULTIPLE']),
+                               'Access Complexity': rng.choice(['LOW', 'MEDIUM', 'HIGH']),
+                               'Confidentiality Impact': rng.choice(['PARTIAL', 'COMPLETE'])})
+            vd.vuln_dict[entry.id] = entry
+            report.append((entry.id, 'plugin %d: vulnerability' % i))
+        report.extend((report[i][0], 'plugin %d: vulnerability' % (size + i)) for i in range(duplicates))
+        profiles.append(VulnProfile(report, vd, 'profile-%d' % k))
+    return profiles
+
+def make_profile_map(profiles):
+    return {'GENERIC': [(0.7, profiles[0]), (0.3, profiles[1])],
+            'SINGLETON': [(0.7, profiles[0]), (0.3, profiles[1])],
+            'SERVER': [(0.4, profiles[2]), (0.6, profiles[3])],
+            'GATEWAY': [(0.4, profiles[2]), (0.6, profiles[3])]}
+
+def make_host_gen(profiles, topology, seed=1):
+    random.seed(seed)
+    connectedness = 2.5 if topology == 'GEN-1' else 0.3
+    return HostGenerator(12, topology, connectedness, dict(ACCESS_PROBS), make_profile_map(profiles))
+
+@pytest.fixture(scope='session')
+def planner():
+    # The planner reads its settings from the command line when loaded
+    argv = sys.argv
+    sys.argv = ['attack-planner.py']
+    try:
+        return imp.load_source('attack_planner', os.path.join(SRC_DIR, 'attack-planner.py'))
+    finally:
+        sys.argv = argv
+
+@pytest.fixture
+def profiles():
+    return make_profiles(duplicates=3)
+
+@pytest.fixture(params=['ER', 'GEN-1'])
+def host_gen(request, profiles):
+    return make_host_gen(profiles, request.param)
@@ -0,0 +1,42 @@
+import os
+
+from artifact_cache import ArtifactCache
+from conftest import make_host_gen, make_profiles
+
+def test_imported_planner_caches_domains(planner, tmpdir, monkeypatch):
+    monkeypatch.setattr(planner, 'CACHE_DIR', str(tmpdir.join('cache')))
+    monkeypatch.setattr(planner, 'ARTIFACT_CACHE', None)
+    monkeypatch.setattr(planner, 'SOLVER', 'FD')
+    profiles = make_profiles()
+    host_gen = make_host_gen(profiles, 'ER')
+    domain_file = str(tmpdir.join('domain.pddl'))
+    planner.load_point(host_gen, profiles, 10, domain_file, str(tmpdir.join('classes.csv')))
+    domain = open(domain_file).read()
+    assert domain.startswith('(define (domain attack_planning)')
+
+    os.remove(domain_file)
+    planner.load_point(host_gen, profiles, 10, domain_file, str(tmpdir.join('classes.csv')))
+    assert open(domain_file).read() == domain
+    assert len([f for f in os.listdir(planner.CACHE_DIR) if f.endswith('.domain.pddl')]) == 1
+
+def test_get_returns_what_was_put(tmpdir):
+    cache = ArtifactCache(str(tmpdir))
+    key = ArtifactCache.key('domain', ['host-0'])
+    assert key == ArtifactCache.key('domain', ['host-0'])
+    assert key != ArtifactCache.key('domain', ['host-1'])
+    assert cache.get(key, 'domain.pddl') is None
+    cache.put(key, 'domain.pddl', '(define)')
+    assert cache.get(key, 'domain.pddl') == '(define)'
+    assert ArtifactCache(str(tmpdir)).get(key, 'domain.pddl') == '(define)'
+
+def test_least_recently_used_entries_are_evicted(tmpdir):
+    cache = ArtifactCache(str(tmpdir), max_bytes=25)
+    for (age, key) in enumerate(['a', 'b']):
+        cache.put(key, 'data', 'x' * 10)
+        os.utime(str(tmpdir.join(key + '.data')), (age, age))
+    # Reading a marks it as used, so b is the oldest entry
+    cache.get('a', 'data')
+    cache.put('c', 'data', 'x' * 10)
+    assert cache.get('a', 'data') is not None
+    assert cache.get('b', 'data') is None
+    assert cache.get('c', 'data') is not None
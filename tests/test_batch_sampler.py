@@ -0,0 +1,66 @@
+import pytest
+
+from batch_sampler import BatchSampler
+from conftest import make_host_gen
+from host_generator import vpn_roles
+from topology import TopologySnapshot
+from trial_rng import TrialRNG
+
+TRIALS = 60
+
+@pytest.mark.parametrize('collapsed', [False, True])
+def test_sampler_matches_snapshot(host_gen, profiles, collapsed):
+    snapshot = TopologySnapshot(host_gen, profiles)
+    sampler = BatchSampler(host_gen, host_gen.access_probs, seed=3)
+    (state, access) = sampler.sample(TRIALS, collapsed, first=5)
+    file_hosts = sampler.sample_file_hosts(TRIALS, first=5)
+    for t in range(TRIALS):
+        rng = TrialRNG(3, 5 + t)
+        hosts = snapshot.sample_hosts(rng, collapsed)
+        assert snapshot.names[file_hosts[t]] == rng.choice(snapshot.get_host_names())
+        for (h, host) in enumerate(hosts):
+            if collapsed:
+                assert [c for c in range(state.shape[2]) if state[t, h, c]] == \
+                       [c for c in range(state.shape[2]) if host.exploit_classes & (1 << c)]
+            else:
+                assert [v for v in range(state.shape[2]) if state[t, h, v]] == \
+                       [vuln.index for vuln in host.vulnerabilities]
+            assert set(level for (l, level) in enumerate(sampler.levels) if access[t, h, l]) == \
+                   set(host.access_levels)
+
+def test_chunks_match_single_batch(host_gen):
+    sampler = BatchSampler(host_gen, host_gen.access_probs, seed=3)
+    (classes, access) = sampler.sample(TRIALS, collapsed=True)
+    start = 0
+    for (chunk_classes, chunk_access) in sampler.iter_chunks(TRIALS, chunk_size=16, collapsed=True):
+        count = chunk_classes.shape[0]
+        assert (chunk_classes == classes[start:start + count]).all()
+        assert (chunk_access == access[start:start + count]).all()
+        start += count
+    assert start == TRIALS
+
+def test_class_hit_rates_match_class_probabilities(host_gen):
+    # Rows listing the same CVE are drawn independently, as class_probabilities assumes
+    sampler = BatchSampler(host_gen, host_gen.access_probs, seed=2)
+    vulns = sampler.sample_vulnerabilities(4000)
+    for (h, host) in enumerate(host_gen.get_hosts()):
+        profile = host.vuln_profile
+        for (c, prob) in enumerate(profile.get_class_probabilities()):
+            rows = [vuln.index for vuln in profile.get_vulnerabilities() if vuln.exploit_class == c]
+            rate = vulns[:, h, rows].any(axis=1).mean()
+            assert abs(rate - prob) < 4 * (prob * (1 - prob) / 4000) ** 0.5 + 1e-9
+
+def test_vpn_access_matches_snapshot(profiles):
+    host_gen = make_host_gen(profiles, 'GEN-1')
+    snapshot = TopologySnapshot(host_gen, profiles)
+    sampler = BatchSampler(host_gen, host_gen.access_probs, seed=3)
+    access = sampler.sample_access_levels(TRIALS)
+    network = sampler.levels.index('NETWORK')
+    (_, reached) = vpn_roles(host_gen.get_hosts())
+    granted = set()
+    for t in range(TRIALS):
+        hosts = snapshot.sample_hosts(TrialRNG(3, t))
+        assert [('NETWORK' in host.access_levels) for host in hosts] == list(access[t, :, network])
+        granted.add(all(access[t, reached, network]))
+    # Both branches of the rule are taken
+    assert granted == set([False, True])
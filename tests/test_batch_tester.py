@@ -0,0 +1,73 @@
+import os
+
+import pytest
+
+from batch_tester import point_key, read_test_cases, run_sweep
+from conftest import make_profiles
+
+TEST_CASES = '''2
+20
+8,12,2
+0.3
+300
+0.05
+150
+ER,YES
+vulns
+OPT-VULN,7
+20
+10
+2.5
+300
+0.05
+150
+GEN-1
+ranks
+RANK
+'''
+
+@pytest.fixture
+def points(planner, monkeypatch, tmpdir):
+    monkeypatch.setattr(planner, 'SOLVER', 'NATIVE')
+    monkeypatch.setattr(planner, 'FILE_DIR', str(tmpdir))
+    monkeypatch.setattr(planner, 'PROBLEM_PATH', str(tmpdir))
+    monkeypatch.setattr(planner, 'load_profiles', lambda paths: make_profiles())
+    test_file = tmpdir.join('test_cases.csv')
+    test_file.write(TEST_CASES)
+    return read_test_cases(str(test_file))
+
+def test_read_test_cases(points):
+    assert points == [(20, 8, 0.3, 0.3, 0.05, 0.15, 'ER', 'vulns', 'OPT-VULN', 7),
+                      (20, 10, 0.3, 0.3, 0.05, 0.15, 'ER', 'vulns', 'OPT-VULN', 7),
+                      (20, 10, 2.5, 0.3, 0.05, 0.15, 'GEN-1', 'ranks', 'RANK', None)]
+
+def point_outputs(output):
+    """
+    Returns the output of every point in an output file by its settings line
+    """
+    blocks = {}
+    for line in output.read().splitlines():
+        # The output of a point starts with its trials and settings
+        if line.startswith('20,'):
+            blocks.setdefault(line, [])
+            settings = line
+        else:
+            blocks[settings].append(line)
+    return blocks
+
+def test_resumed_sweep_skips_finished_points(planner, points, tmpdir):
+    progress = tmpdir.join('test_cases.progress')
+    output = tmpdir.join('outputvulns.csv')
+    run_sweep(planner, points[:2], str(progress))
+    assert not progress.check()
+    outputs = point_outputs(output)
+    assert len(outputs) == 2
+    second = dict((settings, lines) for (settings, lines) in outputs.items() if settings.startswith('20,10,'))
+    assert len(second) == 1 and second.values()[0]
+
+    # An interrupted sweep which finished the first point only runs the second
+    output.remove()
+    progress.write(point_key(0, points[0]) + '\n')
+    run_sweep(planner, points[:2], str(progress))
+    assert not progress.check()
+    assert point_outputs(output) == second
@@ -0,0 +1,34 @@
+import numpy as np
+
+from batch_sampler import BatchSampler
+from bitset_engine import BitsetEngine, pack_trials, unpack_trials
+from reachability import file_witness
+from topology import TopologySnapshot
+from trial_rng import TrialRNG
+
+SEED = 9
+TRIALS = 150
+
+def native_outcomes(snapshot, collapsed, trials=TRIALS, first=0):
+    outcomes = []
+    for t in range(first, first + trials):
+        rng = TrialRNG(SEED, t)
+        hosts = snapshot.sample_hosts(rng, collapsed)
+        outcomes.append(file_witness(hosts, rng.choice(snapshot.get_host_names())) is not None)
+    return outcomes
+
+def test_pack_trials_round_trip():
+    matrix = np.random.RandomState(0).rand(130, 3, 2) < 0.5
+    words = pack_trials(matrix)
+    assert words.shape == (3, 2, 3)
+    assert (unpack_trials(words, 130) == matrix).all()
+
+def test_bitset_matches_native(host_gen, profiles):
+    snapshot = TopologySnapshot(host_gen, profiles)
+    outcomes = native_outcomes(snapshot, True)
+    assert 0 < sum(outcomes) < TRIALS
+
+    engine = BitsetEngine(host_gen)
+    sampler = BatchSampler(host_gen, host_gen.access_probs, SEED)
+    assert list(engine.trial_outcomes(sampler, TRIALS, chunk_size=64)) == outcomes
+    assert list(engine.trial_outcomes(sampler, 50, chunk_size=64, first=70)) == outcomes[70:120]
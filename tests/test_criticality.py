@@ -0,0 +1,37 @@
+import pytest
+
+from criticality import CriticalityRanking
+from reachability import file_witness
+from topology import TopologySnapshot
+from trial_rng import TrialRNG
+
+SEED = 6
+TRIALS = 60
+
+def outcomes(snapshot, collapsed):
+    result = []
+    for t in range(TRIALS):
+        rng = TrialRNG(SEED, t)
+        hosts = snapshot.sample_hosts(rng, collapsed)
+        result.append(1 if file_witness(hosts, rng.choice(snapshot.get_host_names())) is not None else 0)
+    return result
+
+@pytest.mark.parametrize('collapsed', [False, True])
+def test_candidate_outcomes_match_removal(host_gen, profiles, collapsed):
+    snapshot = TopologySnapshot(host_gen, profiles)
+    candidates = [(profile, vuln.name) for profile in sorted(set(snapshot.host_profiles))
+                  for vuln in snapshot.profiles[profile][0]]
+    candidates.extend(name + '->' + other for (name, outgoing) in zip(snapshot.names, snapshot.outgoing)
+                      for other in outgoing)
+    ranking = CriticalityRanking(snapshot, SEED, TRIALS, candidates, collapsed)
+    assert list(ranking.outcomes) == outcomes(snapshot, collapsed)
+
+    for (k, candidate) in enumerate(candidates):
+        if isinstance(candidate, str):
+            delta = ((), (candidate,), ())
+        else:
+            delta = ((candidate,), (), ())
+        assert list(ranking.candidate_outcomes(k)) == outcomes(snapshot.apply(delta), collapsed)
+        # A candidate critical in a trial lies on its shortest attack paths
+        assert ranking.on_path[k] >= ranking.critical[k].sum()
+    assert any(ranking.critical.any(axis=1))
@@ -0,0 +1,42 @@
+from edge_cut import SINK, SOURCE, aggregate_graph, cut_frequencies, host_graph
+from topology import TrialHost
+
+NETWORK_NOAUTH = 1 << 4
+EDGES = {'a': ['b', 'c'], 'b': ['d'], 'c': ['d'], 'd': ['f'], 'f': []}
+
+class FixedSnapshot(object):
+    """
+    Samples the same hosts in every trial, with the file on host f
+    """
+    def sample_hosts(self, rng, collapsed=False):
+        hosts = []
+        for name in sorted(EDGES):
+            host = TrialHost(name, 'GENERIC', EDGES[name], ['ROOT', 'NETWORK'] if name == 'a' else [])
+            host.exploit_classes = NETWORK_NOAUTH
+            hosts.append(host)
+        return hosts
+
+    def get_host_names(self):
+        return ['f']
+
+def test_host_graph_capacities():
+    hosts = FixedSnapshot().sample_hosts(None)
+    (index, graph) = host_graph(hosts, ['a->b', 'd->f'])
+    assert set(graph.successors(SOURCE)) == set([index['a']])
+    assert graph[index['a']][index['b']]['capacity'] == 1
+    assert graph[index['d']][index['f']]['capacity'] == 1
+    assert 'capacity' not in graph[index['a']][index['c']]
+
+def test_aggregate_graph_counts_trials():
+    graph = aggregate_graph(FixedSnapshot(), 0, 3, ['a->b', 'd->f'], True)
+    assert graph['a']['b']['capacity'] == 3
+    assert 'capacity' not in graph['b']['d']
+    assert graph['f'][SINK]['capacity'] == 3 * (2 * 3 + 1)
+
+def test_cut_frequencies():
+    snapshot = FixedSnapshot()
+    all_edges = [host + '->' + other for host in EDGES for other in EDGES[host]]
+    assert cut_frequencies(snapshot, 0, 3, all_edges, True) == {'d->f': 3}
+    assert cut_frequencies(snapshot, 0, 3, ['a->b', 'c->d'], True) == {'a->b': 3, 'c->d': 3}
+    # Trials no candidate can cut stay vulnerable
+    assert cut_frequencies(snapshot, 0, 3, ['a->b'], True) == {}
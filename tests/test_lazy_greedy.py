@@ -0,0 +1,56 @@
+from lazy_greedy import LazyGreedy
+from trial_race import TrialRace
+
+def run_round(queue, gains, valid=None):
+    """
+    Evaluates the stale candidates of a round with the gains given per
+    candidate, returning the order they were evaluated in and the selection
+    """
+    order = []
+    candidates = queue.stale(valid)
+    while candidates:
+        order.append(candidates)
+        queue.update([gains[candidate] for candidate in candidates])
+        candidates = queue.stale(valid)
+    return (order, queue.select())
+
+def test_reevaluates_only_the_top():
+    queue = LazyGreedy(['a', 'b', 'c', 'd'])
+    (order, selected) = run_round(queue, {'a': 0.5, 'b': 0.4, 'c': 0.1, 'd': 0.2})
+    assert order == [['a', 'b', 'c', 'd']]
+    assert selected == (0.5, 'a')
+
+    # b drops below d and c, d is current once re-evaluated
+    (order, selected) = run_round(queue, {'b': 0.05, 'c': 0.08, 'd': 0.15})
+    assert order == [['b'], ['d']]
+    assert selected == (0.15, 'd')
+
+    (order, selected) = run_round(queue, {'b': 0.02, 'c': 0.01})
+    assert order == [['c'], ['b']]
+    assert selected == (0.02, 'b')
+    assert len(queue) == 1
+
+def test_seeded_gains_select_without_evaluating():
+    queue = LazyGreedy(['a', 'b', 'c'], [0.1, 0.3, 0.2])
+    assert queue.stale() == []
+    assert queue.select() == (0.3, 'b')
+    assert queue.stale() == ['c']
+
+def test_invalid_candidates_are_dropped():
+    queue = LazyGreedy(['a', 'b', 'c'])
+    (order, selected) = run_round(queue, {'a': 0.1, 'c': 0.3}, lambda candidate: candidate != 'b')
+    assert order == [['a', 'c']]
+    assert selected == (0.3, 'c')
+    assert queue.stale(lambda candidate: False) == []
+    assert len(queue) == 0
+
+def test_later_rounds_run_every_trial():
+    # Re-evaluating the top alone leaves early stopping nothing to race
+    queue = LazyGreedy(['a', 'b', 'c'])
+    first = queue.stale()
+    assert TrialRace(len(first), 100, 10, 0.05).next_batch(0) == range(10)
+    queue.update([0.3, 0.2, 0.1])
+    queue.select()
+    later = queue.stale()
+    assert later == ['b']
+    assert TrialRace(len(later), 100, 10, 0.05).next_batch(0) == range(100)
@@ -0,0 +1,48 @@
+from nessus_parser import NessusParser, report_files
+
+CSV = '''Plugin ID,CVE,CVSS,Risk,Host,Name
+1,CVE-2014-0001,7.5,High,10.0.0.1,"Apache, mod_ssl"
+2,,0.0,None,10.0.0.1,Info
+3,CVE-2014-0002,4.3,Medium,10.0.0.1,OpenSSH
+3,CVE-2014-0002,4.3,Medium,10.0.0.2,OpenSSH
+'''
+
+NESSUS = '''<?xml version="1.0" ?>
+<NessusClientData_v2><Report name="scan">
+<ReportHost name="10.0.0.1">
+<ReportItem pluginName="OpenSSH"><cve>CVE-2014-0002</cve><cve>CVE-2014-0003</cve></ReportItem>
+<ReportItem pluginName="Info"></ReportItem>
+</ReportHost>
+<ReportHost name="10.0.0.2">
+<ReportItem pluginName="PHP"><cve>CVE-2014-0004</cve></ReportItem>
+</ReportHost>
+</Report></NessusClientData_v2>
+'''
+
+def test_iter_csv(tmpdir):
+    report = tmpdir.join('scan.csv')
+    report.write(CSV)
+    assert list(NessusParser().iter_report(str(report))) == [
+        ('CVE-2014-0001', 'Apache, mod_ssl'),
+        ('CVE-2014-0002', 'OpenSSH'),
+        ('CVE-2014-0002', 'OpenSSH')]
+
+def test_iter_nessus(tmpdir):
+    report = tmpdir.join('scan.nessus')
+    report.write(NESSUS)
+    assert list(NessusParser().iter_report(str(report))) == [
+        ('CVE-2014-0002', 'OpenSSH'),
+        ('CVE-2014-0003', 'OpenSSH'),
+        ('CVE-2014-0004', 'PHP')]
+
+def test_iter_directory(tmpdir):
+    tmpdir.join('b.nessus').write(NESSUS)
+    tmpdir.join('a.csv').write(CSV)
+    tmpdir.join('notes.txt').write('not a report')
+    assert report_files(str(tmpdir)) == [str(tmpdir.join('a.csv')), str(tmpdir.join('b.nessus'))]
+    assert report_files(str(tmpdir.join('a.csv'))) == [str(tmpdir.join('a.csv'))]
+    assert list(NessusParser().iter_directory(str(tmpdir), processes=2)) == [
+        ('CVE-2014-0001', 'Apache, mod_ssl'),
+        ('CVE-2014-0002', 'OpenSSH'),
+        ('CVE-2014-0003', 'OpenSSH'),
+        ('CVE-2014-0004', 'PHP')]
@@ -0,0 +1,58 @@
+import os
+import StringIO
+
+import numpy as np
+
+from batch_sampler import BatchSampler
+from bitset_engine import BitsetEngine
+from conftest import make_host_gen, make_profiles
+from trial_race import RoundResults
+
+SEED = 8
+TRIALS = 200
+
+def outcomes(host_gen):
+    sampler = BatchSampler(host_gen, host_gen.access_probs, SEED)
+    return BitsetEngine(host_gen).trial_outcomes(sampler, TRIALS).astype(np.int8)
+
+def test_vuln_rounds_stay_paired(planner, profiles):
+    host_gen = make_host_gen(profiles, 'ER')
+    assignment = [host.vuln_profile.name for host in host_gen.get_hosts()]
+    out = StringIO.StringIO()
+    optimizer = planner.optimize_vulns(host_gen, profiles, TRIALS, ['ER'], out)
+
+    # Outcomes of each removal evaluated since the last selection
+    evaluated = {}
+    selections = 0
+    candidates = optimizer.next()
+    while True:
+        lines = [line for line in out.getvalue().split(os.linesep) if line.startswith('CVE-')]
+        if len(lines) > selections:
+            # The configuration left by the selected removal is the one its
+            # outcomes were measured on, so the next gains pair trial by trial
+            selected = lines[-1].split(',')[0]
+            assert (outcomes(host_gen) == evaluated[selected]).all()
+            selections = len(lines)
+            evaluated = {}
+        assert [host.vuln_profile.name for host in host_gen.get_hosts()] == assignment
+
+        counts = []
+        round_outcomes = []
+        active = [vuln.name for profile in profiles for vuln in profile.get_vulnerabilities()]
+        for state in candidates:
+            result = outcomes(state)
+            [name] = set(active) - set(vuln.name for profile in profiles for vuln in profile.get_vulnerabilities())
+            evaluated[name] = result
+            counts.append(int(result.sum()))
+            round_outcomes.append(result)
+        try:
+            candidates = optimizer.send(RoundResults(counts, round_outcomes))
+        except StopIteration:
+            break
+    assert selections > 1
+
+def test_vuln_removals_are_unique_per_name(planner):
+    profiles = make_profiles(duplicates=3)
+    removals = planner.vuln_removals(profiles)
+    assert len(removals) == 40
+    assert len(set((profile.name, vuln.name) for (profile, vuln) in removals)) == 40
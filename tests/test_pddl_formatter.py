@@ -0,0 +1,54 @@
+from StringIO import StringIO
+
+from PDDL import PDDL_Formatter as pddl
+
+def render(element):
+    # The recursive formatting the streaming writer replaced
+    if not isinstance(element, pddl._PDDL_FormatElement) or pddl._overrides_str(type(element)):
+        return str(element)
+    return element._format([render(arg) for arg in element.args])
+
+def streamed(element):
+    stream = StringIO()
+    element.write(stream)
+    return stream.getvalue()
+
+def fixed_domain():
+    pddl.types('host', 'File')
+    host = pddl.types.host
+    return pddl.define(pddl.domain('attack_planning', has_colon=0),
+                       pddl.requirements(':strips', ':typing'),
+                       pddl.types('host', 'File'),
+                       pddl.constants(pddl.types.File('File', sticky=1, subindentation_level=2),
+                                      sticky=0, subindentation_level=2),
+                       pddl.predicates(pddl.predicate('connected', host('?h1', '?h2')),
+                                       pddl.predicate('compromised', host('?h')),
+                                       pddl.predicate('network_access', host('?h')),
+                                       sticky=1, subindentation_level=2),
+                       pddl.action('update_access',
+                                   pddl.parameters(host('?h1', '?h2')),
+                                   pddl.precondition(pddl.and_(pddl.predicate('connected', '?h1', '?h2'),
+                                                               pddl.predicate('compromised', '?h1'),
+                                                               pddl.not_(pddl.predicate('network_access', '?h2')))),
+                                   pddl.effect(pddl.predicate('network_access', '?h2')),
+                                   subindentation_level=2))
+
+def fixed_problem():
+    return pddl.define(pddl.problem('ER-Full'), pddl.domain('attack_planning'),
+                       pddl.init(pddl.predicate('connected', 'host-0', 'host-1'),
+                                 pddl.predicate('compromised', 'host-0'), subindentation_level=2),
+                       pddl.goal(pddl.predicate('network_access', 'host-1'), subindentation_level=2))
+
+def test_streaming_matches_recursive_formatting():
+    for element in [fixed_domain(), fixed_problem()]:
+        assert streamed(element) == render(element)
+        assert str(element) == render(element)
+
+def test_problem_bytes():
+    assert streamed(fixed_problem()) == ('(define (problem ER-Full)\n'
+                                         '\t(:domain attack_planning)\n'
+                                         '\t(:init\n'
+                                         '\t\t(connected host-0 host-1)\n'
+                                         '\t\t(compromised host-0))\n'
+                                         '\t(:goal\n'
+                                         '\t\t(network_access host-1)))')
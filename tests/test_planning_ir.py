@@ -0,0 +1,52 @@
+from StringIO import StringIO
+
+from planning_ir import Action, Domain, Problem
+
+def written(ir):
+    stream = StringIO()
+    ir.to_pddl().write(stream)
+    return stream.getvalue()
+
+def test_domain():
+    domain = Domain('attack_planning')
+    domain.add_types('host', 'File')
+    domain.add_types('host')
+    domain.add_constants('File', ['File'])
+    domain.add_predicate('compromised', [('host', ['?h'])])
+    domain.add_predicate('connected', [('host', ['?h1', '?h2'])])
+    domain.add_action(Action('access', [('host', ['?h']), ('File', ['?f'])],
+                             [('compromised', '?h')], [('accessed', '?f')]))
+    # Actions of the same name, e.g. a CVE in several profiles, are written once
+    domain.add_action(Action('access', [], [('connected', '?h', '?h')], [('compromised', '?h')]))
+    assert written(domain) == ('(define (domain attack_planning)\n'
+                               '\t(:requirements :strips :typing)\n'
+                               '\t(:types host File)\n'
+                               '\t(:constants\n'
+                               '\t\tFile - File)\n'
+                               '\t(:predicates (compromised ?h - host)\n'
+                               '\t\t(connected ?h1 ?h2 - host))\n'
+                               '\t(:action access\n'
+                               '\t\t:parameters (?h - host ?f - File)\n'
+                               '\t\t:precondition (compromised ?h)\n'
+                               '\t\t:effect (accessed ?f)))')
+
+def test_problem():
+    problem = Problem('ER-Full', 'attack_planning')
+    problem.add_init(('connected', 'host-0', 'host-1'))
+    problem.add_init(('compromised', 'host-0'))
+    problem.add_init(('connected', 'host-0', 'host-1'))
+    problem.add_goal(('accessed', 'File'))
+    assert written(problem) == ('(define (problem ER-Full)\n'
+                                '\t(:domain attack_planning)\n'
+                                '\t(:init\n'
+                                '\t\t(connected host-0 host-1)\n'
+                                '\t\t(compromised host-0))\n'
+                                '\t(:goal\n'
+                                '\t\t(accessed File)))')
+
+def test_conjunctions():
+    domain = Domain('d')
+    domain.add_types('host')
+    domain.add_action(Action('exploit', [('host', ['?h'])], [('network_access', '?h'), ('user_access', '?h')],
+                             [('compromised', '?h')]))
+    assert ':precondition (and (network_access ?h) (user_access ?h))' in written(domain)
@@ -0,0 +1,40 @@
+import numpy as np
+
+from conftest import make_profiles
+from profile_bundle import ARRAY_COLUMNS, LIST_COLUMNS, load_bundle, write_bundle
+
+def test_round_trip(tmpdir):
+    profiles = make_profiles(duplicates=2)
+    profiles[1].exclude_year(['2014'])
+    profiles[2].remove_vulnerability(profiles[2].get_vulnerabilities()[0].name)
+    path = str(tmpdir.join('profiles.bundle'))
+    write_bundle(path, profiles, 'key')
+
+    loaded = load_bundle(path, 'key')
+    assert [profile.name for profile in loaded] == [profile.name for profile in profiles]
+    for (profile, bundled) in zip(profiles, loaded):
+        rows = np.flatnonzero(profile.active)
+        for column in LIST_COLUMNS:
+            assert getattr(bundled, column) == [getattr(profile, column)[i] for i in rows]
+        for column in ARRAY_COLUMNS:
+            assert (getattr(bundled, column) == getattr(profile, column)[rows]).all()
+            assert not getattr(bundled, column).flags.writeable
+        assert bundled.get_class_probabilities() == profile.get_class_probabilities()
+        assert [(vuln.name, vuln.exploit_class) for vuln in bundled.get_vulnerabilities()] == \
+               [(vuln.name, vuln.exploit_class) for vuln in profile.get_vulnerabilities()]
+
+    # Bundled profiles can still change
+    bundled = loaded[0]
+    removed = bundled.remove_vulnerability(bundled.get_vulnerabilities()[0].name)
+    assert len(bundled.get_vulnerabilities()) == 10
+    for vuln in removed:
+        bundled.add_vulnerability(vuln)
+    assert len(bundled.get_vulnerabilities()) == 12
+
+def test_bundles_of_another_key_are_ignored(tmpdir):
+    path = str(tmpdir.join('profiles.bundle'))
+    assert load_bundle(path, 'key') is None
+    write_bundle(path, make_profiles(), 'key')
+    assert load_bundle(path, 'other') is None
+    tmpdir.join('profiles.bundle').write('not a bundle')
+    assert load_bundle(path, 'key') is None
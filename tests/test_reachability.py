@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from batch_sampler import BatchSampler
+from bitset_engine import BitsetEngine
+from reachability import exposure, file_witness
+from topology import TopologySnapshot
+from trial_rng import TrialRNG
+
+SEED = 9
+TRIALS = 150
+
+def test_exposure_matches_file_hosts(host_gen, profiles):
+    snapshot = TopologySnapshot(host_gen, profiles)
+    weights = np.arange(1.0, len(snapshot.names) + 1)
+    weights[2] = 0.0
+    weights /= weights.sum()
+
+    engine = BitsetEngine(host_gen)
+    sampler = BatchSampler(host_gen, host_gen.access_probs, SEED)
+    batch = engine.trial_outcomes(sampler, TRIALS, weights=weights)
+    for t in range(TRIALS):
+        hosts = snapshot.sample_hosts(TrialRNG(SEED, t), True)
+        (value, witness) = exposure(hosts, weights)
+        witnesses = [file_witness(hosts, name) for name in snapshot.names]
+        assert value == pytest.approx(sum(w for (w, found) in zip(weights, witnesses) if found is not None))
+        assert batch[t] == pytest.approx(value)
+        expected = [found for (w, found) in zip(weights, witnesses) if found is not None and w > 0]
+        assert witness == (frozenset().union(*expected) if expected else None)
+
+@pytest.fixture
+def all_files(planner, monkeypatch):
+    monkeypatch.setattr(planner, 'SOLVER', 'NATIVE')
+    monkeypatch.setattr(planner, 'FILE_MODE', 'ALL')
+    return planner
+
+def test_asset_weights(all_files, host_gen, profiles, tmpdir, monkeypatch):
+    weights_file = tmpdir.join('weights.csv')
+    weights_file.write('host-0,3\nSINGLETON,0\n')
+    monkeypatch.setattr(all_files, 'ASSET_WEIGHTS', str(weights_file))
+    point = all_files.load_point(host_gen, profiles, TRIALS, None, None, seed=SEED)
+    types = point.base_snapshot.types
+    expected = np.array([3.0] + [0.0 if type == 'SINGLETON' else 1.0 for type in types[1:]])
+    assert point.weights == pytest.approx(expected / expected.sum())
+
+def test_zero_asset_weights_are_rejected(all_files, host_gen, profiles, tmpdir, monkeypatch):
+    weights_file = tmpdir.join('weights.csv')
+    weights_file.write('\n'.join(name + ',0' for name in host_gen.get_host_dict()))
+    monkeypatch.setattr(all_files, 'ASSET_WEIGHTS', str(weights_file))
+    with pytest.raises(ValueError):
+        all_files.load_point(host_gen, profiles, TRIALS, None, None, seed=SEED)
@@ -0,0 +1,57 @@
+from multiprocessing import Pool
+from StringIO import StringIO
+
+import pytest
+
+from conftest import make_host_gen, make_profiles
+
+TRIALS = 40
+
+@pytest.fixture
+def native(planner, monkeypatch):
+    monkeypatch.setattr(planner, 'SOLVER', 'NATIVE')
+    return planner
+
+def run(planner, keys, type='OPT-VULN'):
+    """
+    Runs an optimizer per point in keys, each over its own profiles, and
+    returns the points in the order they finished and their outputs
+    """
+    points = {}
+    optimizers = {}
+    outputs = {}
+    for key in keys:
+        profiles = make_profiles()
+        host_gen = make_host_gen(profiles, 'ER', seed=key)
+        points[key] = planner.load_point(host_gen, profiles, TRIALS, None, None, seed=key)
+        outputs[key] = StringIO()
+        optimizers[key] = planner.make_optimizer(type, host_gen, profiles, TRIALS, [str(key)], outputs[key],
+                                                 points[key])
+    finished = []
+    pool = Pool(2, initializer=planner.init_worker, initargs=(points,))
+    try:
+        planner.run_optimizers(pool, points, optimizers, finished.append)
+    finally:
+        pool.terminate()
+    return (finished, dict((key, output.getvalue()) for (key, output) in outputs.items()))
+
+def test_every_point_finishes_once(native):
+    (finished, outputs) = run(native, [1, 2, 3])
+    assert sorted(finished) == [1, 2, 3]
+    assert all(len(output.splitlines()) > 2 for output in outputs.values())
+
+def test_resumed_points_match_a_full_run(native):
+    (_, outputs) = run(native, [1, 2, 3])
+    # A resumed sweep only runs the points which had not finished
+    (finished, resumed) = run(native, [2])
+    assert finished == [2]
+    assert resumed[2] == outputs[2]
+
+def test_task_window_does_not_change_results(native, monkeypatch):
+    (_, outputs) = run(native, [1, 2])
+    monkeypatch.setattr(native, 'TASK_WINDOW', 1)
+    assert run(native, [1, 2])[1] == outputs
+
+def test_points_without_trials_finish(native):
+    (finished, _) = run(native, [4], type='RANK')
+    assert finished == [4]
@@ -0,0 +1,61 @@
+import StringIO
+
+import pytest
+
+from reachability import file_witness
+from sas_task import SASTemplate
+from topology import TopologySnapshot
+from trial_rng import TrialRNG
+
+SEED = 9
+
+def sas_reachable(text):
+    """
+    Whether the goal of a SAS+ task written by SASTemplate is reachable. Its
+    operators only set binary variables to 0, so a fixpoint over the atoms
+    made true decides it.
+    """
+    lines = iter(text.splitlines())
+    line = next(lines)
+    while line != 'begin_state':
+        line = next(lines)
+    state = []
+    line = next(lines)
+    while line != 'end_state':
+        state.append(int(line))
+        line = next(lines)
+    assert next(lines) == 'begin_goal'
+    goal = [tuple(map(int, next(lines).split())) for _ in range(int(next(lines)))]
+    assert next(lines) == 'end_goal'
+
+    operators = []
+    for _ in range(int(next(lines))):
+        assert next(lines) == 'begin_operator'
+        next(lines)
+        prevail = [int(next(lines).split()[0]) for _ in range(int(next(lines)))]
+        effects = [int(next(lines).split()[1]) for _ in range(int(next(lines)))]
+        next(lines)
+        assert next(lines) == 'end_operator'
+        operators.append((prevail, effects))
+
+    true = set(var for (var, value) in enumerate(state) if value == 0)
+    changed = True
+    while changed:
+        changed = False
+        for (prevail, effects) in operators:
+            if all(var in true for var in prevail) and not true.issuperset(effects):
+                true.update(effects)
+                changed = True
+    return all(var in true for (var, _) in goal)
+
+@pytest.mark.parametrize('collapsed', [False, True])
+def test_sas_matches_native(host_gen, profiles, collapsed):
+    snapshot = TopologySnapshot(host_gen, profiles)
+    template = SASTemplate(snapshot, compressed=collapsed)
+    for t in range(40):
+        rng = TrialRNG(SEED, t)
+        hosts = snapshot.sample_hosts(rng, collapsed)
+        file_host = rng.choice(snapshot.get_host_names())
+        stream = StringIO.StringIO()
+        template.write(hosts, file_host, stream)
+        assert sas_reachable(stream.getvalue()) == (file_witness(hosts, file_host) is not None)
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from trial_race import TrialRace, normal_quantile, paired_difference, wilson_interval
+
+def test_wilson_interval():
+    assert normal_quantile(0.975) == pytest.approx(1.959964, abs=1e-6)
+    assert wilson_interval(50, 100, 1.96) == pytest.approx((0.40383, 0.59617), abs=1e-5)
+    assert wilson_interval(0, 10, 1.96) == pytest.approx((0.0, 0.27754), abs=1e-5)
+    assert wilson_interval(0, 0, 1.96) == (0.0, 1.0)
+
+def test_paired_difference_skips_trials_not_run():
+    reference = np.array([1, 1, 0, 1, -1], dtype=np.int8)
+    outcomes = np.array([0, 1, 0, -1, 1], dtype=np.int8)
+    (mean, error, trials) = paired_difference(reference, outcomes)
+    assert (mean, trials) == (pytest.approx(1.0 / 3), 3)
+    assert error == pytest.approx(np.std([1, 0, 0], ddof=1) / np.sqrt(3))
+
+def test_all_trials_in_one_batch_without_error_rate():
+    race = TrialRace(3, 100, batch_size=10)
+    assert race.next_batch(0) == range(100)
+    assert race.next_batch(0) == []
+    # A single candidate has nothing to race against
+    race = TrialRace(1, 100, batch_size=10, error_rate=0.05)
+    assert race.next_batch(0) == range(100)
+
+def test_worse_candidate_stops_early():
+    race = TrialRace(2, 200, batch_size=20, error_rate=0.05)
+    while True:
+        batches = [(c, race.next_batch(c)) for c in range(2)]
+        batches = [(c, batch) for (c, batch) in batches if batch]
+        if not batches:
+            break
+        for (c, batch) in batches:
+            # Candidate 0 is never vulnerable, candidate 1 always
+            race.record(c, batch[0], [c] * len(batch))
+    assert race.runs[0] == 200
+    assert race.stopped(1) and 0 < race.runs[1] < 200
+    results = race.results()
+    assert list(results) == [0, 200]
+    assert list(results.outcomes[1][:race.runs[1]]) == [1] * race.runs[1]
+    assert list(results.outcomes[1][race.runs[1]:]) == [-1] * (200 - race.runs[1])
+
+def test_close_candidates_run_every_trial():
+    race = TrialRace(2, 200, batch_size=20, error_rate=0.05)
+    for first in range(0, 200, 20):
+        for c in range(2):
+            batch = race.next_batch(c)
+            assert batch == range(first, first + 20)
+            race.record(c, first, [(t + c) % 2 for t in batch])
+    assert race.runs == [200, 200]
+
+def test_fractional_estimates_scale_up():
+    race = TrialRace(2, 100, fractional=True)
+    race.record(0, 0, [0.25] * 100)
+    race.record(1, 0, [0.5] * 50)
+    assert race.estimates() == [pytest.approx(25.0), pytest.approx(50.0)]
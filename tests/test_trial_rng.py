@@ -0,0 +1,38 @@
+import numpy as np
+
+from trial_rng import (ACCESS_LEVEL, FILE_HOST, MASK, VULNERABILITY, TrialRNG, file_host_indices,
+                       mix64, mix64_array, name_key, uniforms)
+
+def test_mix64_known_values():
+    # The first outputs of splitmix64 seeded with 0
+    assert mix64(0) == 0xE220A8397B1DCDAF
+    assert mix64(0x9E3779B97F4A7C15) == 0x6E789E6AA1B965F4
+
+def test_mix64_array_matches_mix64():
+    values = [0, 1, 2, 12345, MASK, MASK - 1, 0x9E3779B97F4A7C15, 1 << 63]
+    mixed = mix64_array(np.array(values, dtype=np.uint64))
+    assert [int(x) for x in mixed] == [mix64(x) for x in values]
+
+def test_uniforms_match_trial_rng():
+    keys = [name_key('CVE-2014-0001'), name_key('USER'), 0]
+    draws = uniforms(7, 3, 5, VULNERABILITY, [0, 4], keys)
+    assert draws.shape == (5, 2, 3)
+    for t in range(5):
+        rng = TrialRNG(7, 3 + t)
+        for (h, host) in enumerate([0, 4]):
+            for (k, key) in enumerate(keys):
+                assert draws[t, h, k] == rng.uniform(VULNERABILITY, host, key)
+
+def test_draws_are_independent_of_order():
+    first = TrialRNG(11, 2)
+    second = TrialRNG(11, 2)
+    a = [first.uniform(ACCESS_LEVEL, 1, name_key('ROOT')), first.uniform(VULNERABILITY, 3, 5)]
+    b = [second.uniform(VULNERABILITY, 3, 5), second.uniform(ACCESS_LEVEL, 1, name_key('ROOT'))]
+    assert a == b[::-1]
+    assert all(0.0 <= x < 1.0 for x in a)
+
+def test_file_host_indices_match_choice():
+    names = ['host-%d' % i for i in range(9)]
+    indices = file_host_indices(5, 10, 40, len(names))
+    assert [names[i] for i in indices] == [TrialRNG(5, 10 + t).choice(names) for t in range(40)]
+    assert list(indices) == [int(uniforms(5, 10 + t, 1, FILE_HOST, [0], [0])[0, 0, 0] * 9) for t in range(40)]
@@ -0,0 +1,91 @@
+import os
+import sqlite3
+
+import pytest
+
+from vuln_dict import STORE_FILE, STORE_VERSION, VulnDict, open_store, parse_feed
+
+HEADER = ('<?xml version=\'1.0\' encoding=\'UTF-8\'?>\n'
+          '<nvd xmlns:vuln="http://scap.nist.gov/schema/vulnerability/0.4" '
+          'xmlns:cvss="http://scap.nist.gov/schema/cvss-v2/0.2" '
+          'xmlns="http://scap.nist.gov/schema/feed/vulnerability/2.0" nvd_xml_version="2.0">\n')
+
+ENTRY = '''  <entry id="%(id)s">
+    <vuln:cve-id>%(id)s</vuln:cve-id>
+    <vuln:published-datetime>%(published)s</vuln:published-datetime>
+    <vuln:cvss>
+      <cvss:base_metrics>
+        <cvss:score>7.5</cvss:score>
+        <cvss:access-vector>%(av)s</cvss:access-vector>
+        <cvss:access-complexity>LOW</cvss:access-complexity>
+        <cvss:authentication>NONE</cvss:authentication>
+        <cvss:confidentiality-impact>PARTIAL</cvss:confidentiality-impact>
+      </cvss:base_metrics>
+    </vuln:cvss>
+    <vuln:cwe id="CWE-119"/>
+  </entry>
+'''
+
+UNSCORED = '''  <entry id="%(id)s">
+    <vuln:cve-id>%(id)s</vuln:cve-id>
+    <vuln:published-datetime>2014-01-31T23:55:04.420-05:00</vuln:published-datetime>
+  </entry>
+'''
+
+def write_feed(repo, name, entries):
+    body = ''.join((UNSCORED if entry.get('unscored') else ENTRY) % entry for entry in entries)
+    repo.join(name).write(HEADER + body + '</nvd>\n')
+
+def entry(id, av='NETWORK', published='2014-01-31T23:55:04.420-05:00', unscored=False):
+    return {'id': id, 'av': av, 'published': published, 'unscored': unscored}
+
+def test_lookups(tmpdir):
+    write_feed(tmpdir, 'nvdcve-2.0-2014.xml', [entry('CVE-2014-0001'), entry('CVE-2014-0002', av='LOCAL')])
+    vuln_dict = VulnDict(str(tmpdir)).vuln_dict
+    assert len(vuln_dict) == 2
+    vuln = vuln_dict['CVE-2014-0002']
+    assert (vuln.id, vuln.published_date, vuln.cwe) == ('CVE-2014-0002', '2014-01-31T23:55:04.420-05:00', 'CWE-119')
+    assert vuln.cvss == {'Access Vector': 'LOCAL', 'Authentication': 'NONE',
+                         'Access Complexity': 'LOW', 'Confidentiality Impact': 'PARTIAL'}
+    assert isinstance(vuln.id, str)
+    assert 'CVE-2014-0001' in vuln_dict and 'CVE-2014-0009' not in vuln_dict
+    assert vuln_dict.get('CVE-2014-0009') is None
+    with pytest.raises(KeyError):
+        vuln_dict['CVE-2014-0009']
+    assert sorted(vuln.id for vuln in vuln_dict.values()) == ['CVE-2014-0001', 'CVE-2014-0002']
+
+def test_stores_of_an_older_layout_are_rebuilt(tmpdir):
+    connection = sqlite3.connect(str(tmpdir.join(STORE_FILE)))
+    connection.execute('CREATE TABLE vulns (id TEXT)')
+    connection.commit()
+    connection.close()
+    write_feed(tmpdir, 'nvdcve-2.0-2014.xml', [entry('CVE-2014-0001')])
+    assert len(VulnDict(str(tmpdir)).vuln_dict) == 1
+    assert open_store(str(tmpdir.join(STORE_FILE))).execute('PRAGMA user_version').fetchone()[0] == STORE_VERSION
+
+def test_parse_feed_skips_unscored_entries(tmpdir):
+    write_feed(tmpdir, 'feed.xml', [entry('CVE-2014-0001'), entry('CVE-2014-0002', unscored=True),
+                                    entry('CVE-2014-0003', av='ADJACENT_NETWORK')])
+    assert list(parse_feed(str(tmpdir.join('feed.xml')))) == [
+        ('CVE-2014-0001', '2014-01-31T23:55:04.420-05:00', 'CWE-119', 'NETWORK', 'NONE', 'LOW', 'PARTIAL'),
+        ('CVE-2014-0003', '2014-01-31T23:55:04.420-05:00', 'CWE-119', 'ADJACENT_NETWORK', 'NONE', 'LOW', 'PARTIAL')]
+
+def test_only_changed_feeds_are_ingested(tmpdir, capsys):
+    write_feed(tmpdir, 'nvdcve-2.0-2013.xml', [entry('CVE-2013-0001')])
+    write_feed(tmpdir, 'nvdcve-2.0-2014.xml', [entry('CVE-2014-0001')])
+    VulnDict(str(tmpdir))
+    assert capsys.readouterr()[0].count('Ingesting') == 2
+
+    # Touched but unchanged feeds match their checksum
+    os.utime(str(tmpdir.join('nvdcve-2.0-2013.xml')), (0, 0))
+    VulnDict(str(tmpdir))
+    assert 'Ingesting' not in capsys.readouterr()[0]
+
+    write_feed(tmpdir, 'nvdcve-2.0-2014.xml', [entry('CVE-2014-0001', av='LOCAL'), entry('CVE-2014-0002')])
+    write_feed(tmpdir, 'nvdcve-2.0-2015.xml', [entry('CVE-2015-0001')])
+    tmpdir.join('nvdcve-2.0-2013.xml').remove()
+    vuln_dict = VulnDict(str(tmpdir)).vuln_dict
+    assert capsys.readouterr()[0].count('Ingesting') == 2
+    assert sorted(vuln.id for vuln in vuln_dict.values()) == ['CVE-2014-0001', 'CVE-2014-0002', 'CVE-2015-0001']
+    assert vuln_dict['CVE-2014-0001'].cvss['Access Vector'] == 'LOCAL'
+    assert [name for (name, _) in vuln_dict.get_feeds()] == ['nvdcve-2.0-2014.xml', 'nvdcve-2.0-2015.xml']
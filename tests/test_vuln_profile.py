@@ -0,0 +1,25 @@
+from conftest import make_profiles
+
+def test_remove_and_add_restore_duplicate_rows():
+    profile = make_profiles(duplicates=3)[0]
+    assert len(profile.get_vulnerabilities()) == 13
+    name = profile.get_vulnerabilities()[1].name
+    assert len(profile.rows[name]) == 2
+    probs = list(profile.get_class_probabilities())
+
+    removed = profile.remove_vulnerability(name)
+    assert sorted(vuln.index for vuln in removed) == profile.rows[name]
+    assert len(profile.get_vulnerabilities()) == 11
+    assert name not in [vuln.name for vuln in profile.get_vulnerabilities()]
+    for vuln in removed:
+        profile.add_vulnerability(vuln)
+    assert len(profile.get_vulnerabilities()) == 13
+    assert profile.get_class_probabilities() == probs
+
+def test_restore_leaves_earlier_removals():
+    profile = make_profiles(duplicates=3)[0]
+    name = profile.get_vulnerabilities()[0].name
+    profile.remove_vulnerability(name)
+    # Removing it again, e.g. as a candidate of a later round, restores nothing
+    assert profile.remove_vulnerability(name) == []
+    assert len(profile.get_vulnerabilities()) == 11
@@ -0,0 +1,61 @@
+import pytest
+
+from reachability import file_witness
+from topology import TopologySnapshot
+from trial_rng import TrialRNG
+from witness_cache import MISSING, WitnessCache
+
+SEED = 4
+TRIALS = 80
+
+def candidate_deltas(snapshot):
+    """
+    The deltas removing a single vulnerability of an assigned profile or a
+    single connection
+    """
+    deltas = []
+    for profile in sorted(set(snapshot.host_profiles)):
+        deltas.extend((((profile, vuln.name),), (), ()) for vuln in snapshot.profiles[profile][0])
+    for (name, outgoing) in zip(snapshot.names, snapshot.outgoing):
+        deltas.extend(((), (name + '->' + other,), ()) for other in outgoing)
+    return deltas
+
+def solve(snapshot, collapsed, trial):
+    rng = TrialRNG(SEED, trial)
+    hosts = snapshot.sample_hosts(rng, collapsed)
+    return file_witness(hosts, rng.choice(snapshot.get_host_names()))
+
+@pytest.mark.parametrize('collapsed', [False, True])
+def test_reused_outcomes_match_solving(host_gen, profiles, collapsed):
+    snapshot = TopologySnapshot(host_gen, profiles)
+    base = snapshot.diff(host_gen)
+    cache = WitnessCache(snapshot, TRIALS)
+    for t in range(TRIALS):
+        cache.store(base, t, solve(snapshot, collapsed, t))
+
+    reused = 0
+    for delta in candidate_deltas(snapshot):
+        assert cache.base(delta) is not None
+        (found, element) = cache.base(delta)
+        assert found == base
+        derived = snapshot.apply(delta)
+        for t in range(TRIALS):
+            result = cache.lookup(base, element, t)
+            if result is MISSING:
+                continue
+            reused += 1
+            assert result[0] == (solve(derived, collapsed, t) is not None)
+    assert reused > 0
+
+def test_capacity_drops_least_recent(host_gen, profiles):
+    snapshot = TopologySnapshot(host_gen, profiles)
+    (first, second, third) = candidate_deltas(snapshot)[:3]
+    cache = WitnessCache(snapshot, 4)
+    for delta in [first, second]:
+        cache.store(delta, 0, None)
+        cache.store(delta, 1, frozenset())
+    cache.touch(first)
+    cache.store(third, 0, None)
+    assert first in cache and third in cache and second not in cache
+    assert cache.lookup(first, None, 1) == (1, frozenset())
+    assert cache.lookup(first, None, 2) is MISSING